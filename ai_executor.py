@@ -0,0 +1,113 @@
+import itertools
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from constants import *
+from ui_dispatcher import UIDispatcher
+
+
+class AIDecisionExecutor:
+	"""
+	Runs AI decisions on a worker thread and delivers them on the Tk thread.
+
+	A decision that is still running after `budget` ms on `clock` is answered by its fallback and its
+	late result is dropped. cancel_all() drops every pending decision, e.g. when a game is reset.
+	A worker still busy with a dropped decision is left to finish it while later decisions start on a
+	fresh one. Decision latencies are kept for the last `window` decisions.
+	"""
+
+	def __init__(self, dispatcher: UIDispatcher, clock, budget: int = AI_DECISION_BUDGET,
+				 window: int = AI_LATENCY_WINDOW):
+		self.dispatcher = dispatcher
+		self.clock = clock
+		self.budget = budget
+		self.executor = self._new_executor()
+		self.pending: dict[int, Future] = {}
+		self.tokens = itertools.count()
+		self.latencies = deque(maxlen=window)
+		self.timeouts = 0
+		self.failures = 0
+
+	@staticmethod
+	def _new_executor() -> ThreadPoolExecutor:
+		return ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-decision")
+
+	def submit(self, function, *args, on_done, fallback) -> Future:
+		token = next(self.tokens)
+		start = time.perf_counter()
+
+		def decide():
+			try:
+				return function(*args)
+			finally:
+				self.latencies.append(time.perf_counter() - start)
+
+		future = self.executor.submit(decide)
+		self.pending[token] = future
+		future.add_done_callback(lambda done: self.dispatcher.post(self._deliver, token, done, on_done, fallback))
+		self.clock.after(self.budget, self._expire, token, on_done, fallback)
+		return future
+
+	def _deliver(self, token: int, future: Future, on_done, fallback):
+		if self.pending.pop(token, None) is None or future.cancelled():
+			return
+		if future.exception() is not None:
+			self.failures += 1
+			on_done(fallback())
+		else:
+			on_done(future.result())
+
+	def _expire(self, token: int, on_done, fallback):
+		future = self.pending.pop(token, None)
+		if future is None:
+			return
+		self._abandon([future])
+		self.timeouts += 1
+		on_done(fallback())
+
+	def _abandon(self, futures: list[Future]):
+		if not all([future.cancel() or future.done() for future in futures]):
+			self.executor.shutdown(wait=False)
+			self.executor = self._new_executor()
+
+	def cancel_all(self):
+		self._abandon(list(self.pending.values()))
+		self.pending.clear()
+
+	def stats(self) -> dict:
+		latencies = np.array(self.latencies) * 1000
+		return {
+			"decisions": len(latencies),
+			"timeouts": self.timeouts,
+			"failures": self.failures,
+			"latency_ms": dict(zip(("50", "90", "99", "max"),
+								   np.percentile(latencies, [50, 90, 99, 100]).tolist())) if len(latencies) else {},
+		}
+
+	def shutdown(self):
+		self.cancel_all()
+		self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InlineDecisionExecutor(AIDecisionExecutor):
+	"""
+	Runs each decision on the calling thread as soon as it is submitted and delivers it through the
+	dispatcher like AIDecisionExecutor. Used with a VirtualClock, where no wall-clock time passes,
+	so decisions never time out and scripted games replay exactly.
+	"""
+
+	def submit(self, function, *args, on_done, fallback) -> Future:
+		token = next(self.tokens)
+		future = Future()
+		start = time.perf_counter()
+		try:
+			future.set_result(function(*args))
+		except Exception as exception:
+			future.set_exception(exception)
+		self.latencies.append(time.perf_counter() - start)
+		self.pending[token] = future
+		self.dispatcher.post(self._deliver, token, future, on_done, fallback)
+		return future
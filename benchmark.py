@@ -0,0 +1,247 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from constants import *
+from q_learning import QLearningYahtzee, QAction, StateKey
+from q_table import QTable, N_ACTIONS
+from scoring import MULTISETS
+from state import State, Action, Category
+from utils import calculate_probability, calculate_score
+
+_CATEGORIES = list(Category)
+_TABLE_PATH = os.path.join(tempfile.gettempdir(), f"benchmark_{Q_TABLE_FILE}")
+
+
+def _sample_states(count: int, seed: int = BENCHMARK_SEED) -> list[State]:
+	rng = random.Random(seed)
+	states = []
+	for _ in range(count):
+		dice = [rng.randint(1, 6) for _ in range(5)]
+		held = rng.randint(0, 5)
+		state = State(dice_held=dice[:held], dice_on_table=dice[held:], rolls_left=rng.randint(0, 3))
+		# State() swaps an empty table for the starting dice.
+		state.dice_on_table = dice[held:]
+		for category in rng.sample(_CATEGORIES, rng.randint(0, len(_CATEGORIES) - 1)):
+			state.set_score(category, 0)
+		states.append(state)
+	return states
+
+
+def _q_action(state: State, rng: random.Random) -> QAction:
+	# HOLD and RELEASE are only benchmarked on held dice, as in training.
+	action = rng.choice(list(Action) if state.dice_held else [Action.ROLL, Action.SCORE])
+	match action:
+		case Action.HOLD:
+			return QAction(action, tuple(state.dice_held[:rng.randint(1, len(state.dice_held))]))
+		case Action.RELEASE:
+			return QAction(action, tuple(state.dice_held))
+		case Action.SCORE:
+			return QAction(action, rng.choice(_CATEGORIES))
+	return QAction(action)
+
+
+def _random_table(rows: int, seed: int = BENCHMARK_SEED) -> QTable:
+	rng = np.random.default_rng(seed)
+	keys = rng.choice(1 << 40, rows, replace=False).astype(np.int64)
+	return QTable.from_arrays(keys, rng.random((rows, N_ACTIONS), dtype=np.float32),
+							  rng.integers(0, 3, (rows, N_ACTIONS), dtype=np.uint32))
+
+
+def bench_calculate_score():
+	hands = [list(hand) for hand in MULTISETS]
+
+	def run():
+		for hand in hands:
+			for category in _CATEGORIES:
+				calculate_score(category, hand)
+	return run
+
+
+def bench_calculate_probability():
+	states = _sample_states(BENCHMARK_SAMPLES)
+	rng = random.Random(BENCHMARK_SEED)
+	calls = [(rng.choice(_CATEGORIES), state.dice_held, state.rolls_left) for state in states]
+
+	def run():
+		for category, dice, rolls_left in calls:
+			calculate_probability(category, dice, rolls_left)
+	return run
+
+
+def bench_evaluate_reward():
+	# The reward cache is cleared before every run so it stays cold.
+	states = _sample_states(BENCHMARK_SAMPLES)
+	rng = random.Random(BENCHMARK_SEED)
+	calls = [(state, _q_action(state, rng), [category for category, score in state.categories[0].items()
+											  if score == -1]) for state in states]
+
+	def run():
+		agent = QLearningYahtzee(BENCHMARK_SEED)
+		agent.clear_reward_cache()
+		for state, q_action, available in calls:
+			agent.evaluate_reward(state, q_action, available)
+	return run
+
+
+def bench_state_key():
+	states = _sample_states(BENCHMARK_SAMPLES)
+
+	def run():
+		for state in states:
+			hash(StateKey(state))
+	return run
+
+
+def bench_update_q_value():
+	rng = np.random.default_rng(BENCHMARK_SEED)
+	state_ids = rng.integers(0, 1 << 40, 1000).tolist()
+	steps = [(state_ids[rng.integers(1000)], int(rng.integers(N_ACTIONS)), float(rng.random()),
+			  state_ids[rng.integers(1000)]) for _ in range(BENCHMARK_SAMPLES)]
+	legal = np.ones(N_ACTIONS, dtype=bool)
+
+	def run():
+		agent = QLearningYahtzee(BENCHMARK_SEED)
+		for state_id, action_id, reward, next_state_id in steps:
+			agent.update_q_value(state_id, action_id, reward, next_state_id, legal)
+	return run
+
+
+def bench_train_episode():
+	def run():
+		agent = QLearningYahtzee(BENCHMARK_SEED)
+		with contextlib.redirect_stdout(io.StringIO()):
+			agent.train(BENCHMARK_TRAIN_EPISODES)
+	return run
+
+
+def bench_save_q_table():
+	agent = QLearningYahtzee()
+	agent.q_table = _random_table(BENCHMARK_TABLE_ROWS)
+
+	def run():
+		agent.save_q_table(_TABLE_PATH)
+	return run
+
+
+def bench_load_q_table():
+	_random_table(BENCHMARK_TABLE_ROWS).save(_TABLE_PATH)
+
+	def run():
+		QLearningYahtzee().load_q_table(_TABLE_PATH)
+	return run
+
+
+def import_time(module: str) -> float:
+	# Cumulative import time of `module` in seconds, in a fresh interpreter with -X importtime.
+	output = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True,
+							text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stderr
+	for line in reversed(output.splitlines()):
+		fields = line.split("|")
+		if len(fields) == 3 and fields[2].strip() == module:
+			return int(fields[1]) / 1e6
+	raise ValueError(f"No import time reported for {module}")
+
+
+def bench_import(module: str):
+	def run():
+		return import_time(module)
+	return run
+
+
+BENCHMARKS = {
+	"calculate_score": bench_calculate_score,
+	"calculate_probability": bench_calculate_probability,
+	"evaluate_reward": bench_evaluate_reward,
+	"state_key": bench_state_key,
+	"update_q_value": bench_update_q_value,
+	"train_episode": bench_train_episode,
+	"save_q_table": bench_save_q_table,
+	"load_q_table": bench_load_q_table,
+	**{f"import_{module}": lambda module=module: bench_import(module) for module in IMPORT_TIME_BUDGETS},
+}
+
+# Work done by one run, so results are reported per call, per episode or per table.
+BENCHMARK_UNITS = {
+	"calculate_score": len(MULTISETS) * len(Category),
+	"calculate_probability": BENCHMARK_SAMPLES,
+	"evaluate_reward": BENCHMARK_SAMPLES,
+	"state_key": BENCHMARK_SAMPLES,
+	"update_q_value": BENCHMARK_SAMPLES,
+	"train_episode": BENCHMARK_TRAIN_EPISODES,
+	"save_q_table": 1,
+	"load_q_table": 1,
+	**{f"import_{module}": 1 for module in IMPORT_TIME_BUDGETS},
+}
+
+
+def run_benchmarks(names: list[str] | None = None, repeats: int = BENCHMARK_REPEATS) -> dict[str, float]:
+	"""
+	Runs each benchmark `repeats` times and returns the best time in microseconds per unit of work.
+	Benchmarks that measure their own time, like the import-time ones, return it in seconds.
+	"""
+	results = {}
+	for name in names or BENCHMARKS:
+		run = BENCHMARKS[name]()
+		best = float("inf")
+		for _ in range(repeats):
+			start = time.perf_counter()
+			measured = run()
+			best = min(best, time.perf_counter() - start if measured is None else measured)
+		results[name] = best / BENCHMARK_UNITS[name] * 1e6
+	return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+	regressions = []
+	for name, value in results.items():
+		if name in baseline and value > baseline[name] * (1 + threshold):
+			regressions.append(f"{name}: {value:.2f}us vs baseline {baseline[name]:.2f}us "
+							   f"(+{value / baseline[name] - 1:.0%})")
+	return regressions
+
+
+def over_budget(results: dict[str, float]) -> list[str]:
+	failures = []
+	for module, budget in IMPORT_TIME_BUDGETS.items():
+		value = results.get(f"import_{module}")
+		if value is not None and value > budget * 1000:
+			failures.append(f"import_{module}: {value / 1000:.0f}ms over the {budget}ms import budget")
+	return failures
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Benchmark the hot paths and check them against a baseline.")
+	parser.add_argument("names", nargs="*", help=f"benchmarks to run, all by default: {', '.join(BENCHMARKS)}")
+	parser.add_argument("--baseline", default=BENCHMARK_BASELINE_FILE)
+	parser.add_argument("--save-baseline", action="store_true")
+	parser.add_argument("--threshold", type=float, default=BENCHMARK_THRESHOLD)
+	parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS)
+	args = parser.parse_args()
+	for unknown in set(args.names) - set(BENCHMARKS):
+		parser.error(f"unknown benchmark {unknown!r}")
+
+	benchmark_results = run_benchmarks(args.names, args.repeats)
+	for benchmark, microseconds in benchmark_results.items():
+		print(f"{benchmark:<24}{microseconds:>14.2f} us")
+
+	failures = over_budget(benchmark_results)
+	if args.save_baseline:
+		with open(args.baseline, "w") as file:
+			json.dump(benchmark_results, file, indent=4)
+		print(f"Baseline written to {args.baseline}")
+	elif os.path.exists(args.baseline):
+		with open(args.baseline) as file:
+			failures += compare(benchmark_results, json.load(file), args.threshold)
+	for failure in failures:
+		print(f"REGRESSION {failure}")
+	sys.exit(1 if failures else 0)
@@ -0,0 +1,42 @@
+import heapq
+import itertools
+import time
+
+
+class TkClock:
+	"""Wall-clock milliseconds with callbacks scheduled on the Tk loop."""
+
+	def __init__(self, root):
+		self.root = root
+
+	@staticmethod
+	def now() -> float:
+		return time.monotonic() * 1000
+
+	def after(self, ms: int, function, *args):
+		return self.root.after(ms, function, *args)
+
+
+class VirtualClock:
+	"""
+	A clock that only moves when advanced, so the GUI can be driven from scripts and tests.
+	Callbacks run in time order and in scheduling order for equal times.
+	"""
+
+	def __init__(self):
+		self.time = 0.0
+		self.timers = []
+		self.counter = itertools.count()
+
+	def now(self) -> float:
+		return self.time
+
+	def after(self, ms: int, function, *args):
+		heapq.heappush(self.timers, (self.time + ms, next(self.counter), function, args))
+
+	def advance(self, ms: float):
+		deadline = self.time + ms
+		while self.timers and self.timers[0][0] <= deadline:
+			self.time, _, function, args = heapq.heappop(self.timers)
+			function(*args)
+		self.time = deadline
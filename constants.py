@@ -10,6 +10,19 @@ DICE_ROLL_DURATION = 1000
 DICE_HOLD_DURATION = 1000
 DICE_ROLL_INTERVAL = 50
 
+# Milliseconds per animation step: rolling, one frame of a roll, moving one die and waiting before an AI move.
+ANIMATION_PROFILES = {
+	"full": {"roll": 1000, "roll_interval": DICE_ROLL_INTERVAL, "hold": DICE_HOLD_DURATION,
+			 "ai_delay": DICE_ROLL_DURATION},
+	"reduced": {"roll": 250, "roll_interval": DICE_ROLL_INTERVAL, "hold": 200, "ai_delay": 200},
+	"off": {"roll": 0, "roll_interval": 0, "hold": 0, "ai_delay": 0},
+}
+ANIMATION_PROFILE = "full"
+ANIMATION_MENU_X = 20
+ANIMATION_MENU_Y = 20
+ANIMATION_MENU_WIDTH = 120
+ANIMATION_MENU_HEIGHT = 30
+
 HUMAN_IMAGE_PATH = "img/human_photo.png"
 AI_IMAGE_PATH = "img/ai_photo.png"
 DICE_IMAGE_PATH_TEMPLATE = "img/dice_{}.png"
@@ -39,9 +52,57 @@ AI_ACTION_LABEL_Y = 50
 AI_ACTION_LABEL_WIDTH = 400
 AI_ACTION_LABEL_HEIGHT = 20
 
+AI_PROGRESS_LABEL_X = 580
+AI_PROGRESS_LABEL_Y = 80
+AI_PROGRESS_LABEL_WIDTH = 400
+AI_PROGRESS_LABEL_HEIGHT = 20
+AI_WARM_START_EPISODES = 1_000
+AI_WARM_START_PROGRESS_EVERY = 50
+AI_READY_POLL_INTERVAL = 100
+UI_QUEUE_INTERVAL = 16
+UI_FRAME_BUDGET = 8
+CHAT_STREAM_BATCH_TOKENS = 4
+AI_DECISION_BUDGET = 2000
+AI_LATENCY_WINDOW = 1000
+
 ALPHA = 0.1
 GAMMA = 0.9
 EPSILON = 1.0
 EPSILON_DECAY = 0.99995
 MIN_EPSILON = 0.1
-Q_TABLE_FILE = "q_table.csv"
+Q_TABLE_FILE = "q_table.bin"
+Q_TABLE_CSV_FILE = "q_table.csv"
+Q_TABLE_CAPACITY = 1 << 14
+VEC_ENV_SIZE = 1024
+PARALLEL_MERGE_EPISODES = 10_240
+TRAJECTORY_LOG_DIR = "trajectories"
+TRAJECTORY_LOG_EVERY = 1
+TRAJECTORY_BUFFER_SIZE = 1 << 16
+TRAJECTORY_BUFFERS = 4
+CHECKPOINT_FILE = "training_checkpoint.pkl"
+CHECKPOINT_EVERY = 1000
+CHECKPOINT_VERSION = 2
+REWARD_CACHE_SIZE = 1 << 16
+DICE_BUFFER_SIZE = 1 << 14
+TOURNAMENT_SHARD_GAMES = 250
+TOURNAMENT_TURN_STEPS = 50
+TOURNAMENT_RESULTS_FILE = "tournament_results.json"
+BENCHMARK_BASELINE_FILE = "benchmark_baseline.json"
+BENCHMARK_SEED = 1234
+BENCHMARK_SAMPLES = 2000
+BENCHMARK_TRAIN_EPISODES = 100
+BENCHMARK_TABLE_ROWS = 200_000
+BENCHMARK_REPEATS = 5
+BENCHMARK_THRESHOLD = 0.25
+# Import-time budgets in milliseconds, measured with -X importtime in a fresh interpreter.
+IMPORT_TIME_BUDGETS = {"game": 300, "q_learning": 400, "gui": 600}
+METRICS_EVERY = 1000
+METRICS_SAMPLE_EVERY = 10
+METRICS_PROFILE_FILE = "training_profile"
+METRICS_MEMORY_TOP = 25
+
+# Yahtzee.score does not award the upper-section bonus, so the solver defaults to no bonus.
+UPPER_BONUS_THRESHOLD = 63
+UPPER_BONUS = 0
+OPTIMAL_TABLE_FILE = "optimal_values.npy"
+OPTIMAL_TURN_CACHE_SIZE = 4096
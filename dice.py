@@ -0,0 +1,33 @@
+import numpy as np
+
+from constants import *
+
+
+class DiceSource:
+	"""
+	Deals die faces from a seeded NumPy generator, drawing them in bulk into a buffer.
+
+	Two sources built with the same seed deal the same faces. spawn() derives independent child
+	streams for parallel games or workers.
+	"""
+
+	def __init__(self, seed: int | np.random.SeedSequence | np.random.Generator | None = None,
+				 buffer_size: int = DICE_BUFFER_SIZE):
+		self.rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+		self.buffer_size = buffer_size
+		self.faces: list[int] = []
+		self.position = 0
+
+	def _fill(self):
+		self.faces = self.rng.integers(1, 7, self.buffer_size, dtype=np.int8).tolist()
+		self.position = 0
+
+	def roll(self, count: int) -> list[int]:
+		if self.position + count > len(self.faces):
+			self._fill()
+		dice = self.faces[self.position:self.position + count]
+		self.position += count
+		return dice
+
+	def spawn(self, count: int) -> list["DiceSource"]:
+		return [DiceSource(rng, self.buffer_size) for rng in self.rng.spawn(count)]
@@ -0,0 +1,52 @@
+import tkinter as tk
+
+from constants import *
+from utils import load_dice_image
+
+
+def load_dice_sprites(size: tuple[int, int] = DICE_IMAGE_SIZE) -> dict[int, tk.PhotoImage]:
+	return {face: load_dice_image(face, size) for face in range(1, 7)}
+
+
+class DiceRenderer:
+	"""
+	Owns one canvas image item per dice slot and only reconfigures items whose face, position or
+	visibility changed. Sprites are decoded once, so redraws create no images or canvas items.
+	"""
+
+	def __init__(self, canvas: tk.Canvas, on_table_click, on_held_click, size: tuple[int, int] = DICE_IMAGE_SIZE):
+		self.canvas = canvas
+		self.sprites = load_dice_sprites(size)
+		self.table_items = [self._create_item(position, on_table_click, slot)
+							for slot, position in enumerate(DICE_POSITIONS_ON_TABLE)]
+		self.held_items = [self._create_item(position, on_held_click, slot)
+						   for slot, position in enumerate(DICE_POSITIONS_HOLD_HUMAN)]
+		self.shown = {}
+
+	def _create_item(self, position: tuple[int, int], on_click, slot: int) -> int:
+		item = self.canvas.create_image(*position, image=self.sprites[1], anchor=tk.NW, state=tk.HIDDEN)
+		self.canvas.tag_bind(item, "<Button-1>", lambda event: on_click(slot))
+		return item
+
+	def _show(self, item: int, value: int | None, position: tuple[int, int]):
+		shown = (value, position) if value is not None else None
+		if self.shown.get(item, ()) == shown:
+			return
+		if value is None:
+			self.canvas.itemconfigure(item, state=tk.HIDDEN)
+		else:
+			self.canvas.itemconfigure(item, image=self.sprites[value], state=tk.NORMAL)
+			self.canvas.coords(item, *position)
+		self.shown[item] = shown
+
+	def render_table(self, dice: list[int]):
+		for slot, item in enumerate(self.table_items):
+			self._show(item, dice[slot] if slot < len(dice) else None, DICE_POSITIONS_ON_TABLE[slot])
+
+	def render_held(self, dice: list[int], positions: list[tuple[int, int]]):
+		for slot, item in enumerate(self.held_items):
+			self._show(item, dice[slot] if slot < len(dice) else None, positions[slot])
+
+	def render(self, dice_on_table: list[int], dice_held: list[int], held_positions: list[tuple[int, int]]):
+		self.render_table(dice_on_table)
+		self.render_held(dice_held, held_positions)
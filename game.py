@@ -1,10 +1,42 @@
-import secrets
+import copy
 from abc import ABC, abstractmethod
 from state import *
+from scoring import calculate_score
+from dice import DiceSource
 import random
 
+ACTION_WEIGHTS = {Action.ROLL: 1, Action.HOLD: 5, Action.RELEASE: 10, Action.SCORE: 1}
+
+
+def _possible_actions(rolls_left: int, previous_action: Action, on_table: bool, held: bool) -> tuple[Action, ...]:
+	if rolls_left == 0:
+		return Action.SCORE,
+	if rolls_left == 3:
+		return Action.ROLL,
+
+	free = previous_action != Action.HOLD and previous_action != Action.RELEASE
+	legal = [Action.ROLL]
+	if on_table and 1 < rolls_left < 3 and free:
+		legal.append(Action.HOLD)
+	if held and 1 < rolls_left < 3 and free:
+		legal.append(Action.RELEASE)
+	if free:
+		legal.append(Action.SCORE)
+	return tuple(action for action in legal for _ in range(ACTION_WEIGHTS[action]))
+
+
+# Legal actions keyed by (rolls left, previous action, dice on table?, dice held?). Each action is
+# repeated by its sampling weight, so a uniform choice over the tuple is the weighted draw.
+POSSIBLE_ACTIONS = {(rolls_left, previous_action, on_table, held): _possible_actions(rolls_left, previous_action,
+																					   on_table, held)
+					for rolls_left in range(4) for previous_action in Action
+					for on_table in (False, True) for held in (False, True)}
+
 
 class YahtzeeAIBase(ABC):
+	rng: random.Random | None = None
+	previous_action: Action = Action.ROLL
+
 	@abstractmethod
 	def choose_action(self, state: State) -> Action:
 		pass
@@ -14,120 +46,91 @@ class YahtzeeAIBase(ABC):
 		pass
 
 	@abstractmethod
-	def choose_hold(self, dice_on_table: list[int]) -> list[int]:
+	def choose_hold(self, state: State) -> list[int]:
 		pass
 
 	@abstractmethod
-	def choose_release(self, dice_held: list[int]) -> list[int]:
+	def choose_release(self, state: State) -> list[int]:
 		pass
 
 	@staticmethod
-	def get_possible_actions(state: State, previous_action: Action) -> list[Action]:
-		actions = []
-		if state.rolls_left == 0:
-			return [Action.SCORE]
-		if state.rolls_left == 3:
-			return [Action.ROLL]
-
-		if state.rolls_left > 0:
-			actions.extend([Action.ROLL])
-		if len(state.dice_on_table) > 0 and 1 < state.rolls_left < 3 and (Action.HOLD != previous_action and previous_action != Action.RELEASE):
-			actions.extend([Action.HOLD] * 5)
-		if len(state.dice_held) != 0 and 1 < state.rolls_left < 3 and (Action.HOLD != previous_action and previous_action != Action.RELEASE):
-			actions.extend([Action.RELEASE] * 10)
-		if Action.HOLD != previous_action and previous_action != Action.RELEASE:
-			actions.extend([Action.SCORE])
-   
-		return actions
+	def get_possible_actions(state: State, previous_action: Action) -> tuple[Action, ...]:
+		return POSSIBLE_ACTIONS[state.rolls_left, previous_action, bool(state.dice_on_table), bool(state.dice_held)]
+
+	def fork(self) -> "YahtzeeAIBase":
+		# A copy for one decision: it shares the policy but has its own RNG and previous action, so
+		# a decision that is thrown away leaves this AI unchanged.
+		fork = copy.copy(self)
+		if self.rng is not None:
+			fork.rng = random.Random()
+			fork.rng.setstate(self.rng.getstate())
+		return fork
+
+	def adopt(self, fork: "YahtzeeAIBase"):
+		self.rng = fork.rng
+		self.previous_action = fork.previous_action
 
 
 class RandomYahtzeeAI(YahtzeeAIBase):
+	def __init__(self, seed: int | None = None):
+		self.rng = random.Random(seed)
+		self.previous_action = Action.ROLL
+
 	def choose_action(self, state: State) -> Action:
-		return secrets.choice(self.get_possible_actions(state))
+		self.previous_action = self.rng.choice(self.get_possible_actions(state, self.previous_action))
+		return self.previous_action
 
 	def choose_category(self, state: State) -> Category:
 		available_categories = [cat for cat, score in state.categories[state.turn].items() if score == -1]
-		return secrets.choice(available_categories) if available_categories else None
+		return self.rng.choice(available_categories) if available_categories else None
 
-	def choose_hold(self, dice_on_table: list[int]) -> list[int]:
-		return random.sample(dice_on_table, random.randint(0, len(dice_on_table) - 1)) if dice_on_table else []
+	def choose_hold(self, state: State) -> list[int]:
+		dice = state.dice_on_table
+		return self.rng.sample(dice, self.rng.randint(0, len(dice) - 1)) if dice else []
 
-	def choose_release(self, dice_held: list[int]) -> list[int]:
-		return random.sample(dice_held, random.randint(0, len(dice_held) - 1)) if dice_held else []
+	def choose_release(self, state: State) -> list[int]:
+		dice = state.dice_held
+		return self.rng.sample(dice, self.rng.randint(0, len(dice) - 1)) if dice else []
 
 
 class Yahtzee:
-	def __init__(self, ai: YahtzeeAIBase):
+	def __init__(self, ai: YahtzeeAIBase, dice: DiceSource | None = None):
 		self.state = State()
 		self.ai = ai
+		self.dice = dice if dice is not None else DiceSource()
 
 	def roll(self):
 		self.state.state_type = StateType.ROLLING
 		self.state.rolls_left -= 1
-		self.state.dice_on_table = [random.randint(1, 6) for _ in range(len(self.state.dice_on_table))]
+		self.state.dice_on_table = self.dice.roll(len(self.state.dice_on_table))
 
 	def hold(self, index: int):
-		self.state.dice_held.append(self.state.dice_on_table.pop(index))
+		self.state.hold(self.state.dice_on_table[index])
 
 	def release(self, index: int):
-		self.state.dice_on_table.append(self.state.dice_held.pop(index))
+		self.state.release(self.state.dice_held[index])
 
 	def score(self, category: Category):
 		score = self.calculate_score(category)
-		self.state.categories[self.state.turn][category] = score
-		self.state.score[self.state.turn] += score
+		if category in CATEGORY_INDEX:
+			self.state.set_score(category, score)
 		return score
 
 	def calculate_score(self, category: Category) -> int:
-		dice = self.state.dice_on_table + self.state.dice_held
-		match category:
-			case Category.ONES:
-				return dice.count(1)
-			case Category.TWOS:
-				return dice.count(2) * 2
-			case Category.THREES:
-				return dice.count(3) * 3
-			case Category.FOURS:
-				return dice.count(4) * 4
-			case Category.FIVES:
-				return dice.count(5) * 5
-			case Category.SIXES:
-				return dice.count(6) * 6
-			case Category.THREE_OF_A_KIND:
-				return sum(dice) if any(dice.count(x) >= 3 for x in set(dice)) else 0
-			case Category.FOUR_OF_A_KIND:
-				return sum(dice) if any(dice.count(x) >= 4 for x in set(dice)) else 0
-			case Category.FULL_HOUSE:
-				return 25 if sorted([dice.count(x) for x in set(dice)]) == [2, 3] else 0
-			case Category.SMALL_STRAIGHT:
-				if {1, 2, 3, 4}.issubset(dice) or {2, 3, 4, 5}.issubset(dice) or {3, 4, 5, 6}.issubset(dice):
-					return 30
-				return 0
-			case Category.LARGE_STRAIGHT:
-				if set(dice) == {1, 2, 3, 4, 5} or set(dice) == {2, 3, 4, 5, 6}:
-					return 40
-				return 0
-			case Category.YAHTZEE:
-				return 50 if len(set(dice)) == 1 else 0
-			case Category.CHANCE:
-				return sum(dice)
-		return 0
+		return calculate_score(category, self.state.dice_on_table + self.state.dice_held)
 
 	def end_turn(self):
 		self.state.state_type = StateType.INITIAL
 		self.state.turn = 1 - self.state.turn
 		self.state.rolls_left = 3
-		self.state.dice_held = []
-		self.state.dice_on_table = [1, 2, 3, 4, 5]
+		self.state.held = 0
+		self.state.table = START_TABLE
 
 	def is_game_finished(self) -> bool:
-		for category, score in self.state.categories[1 - self.state.turn].items():
-			if score == -1:
-				return False
-		return True
+		return self.state.used[1 - self.state.turn] == ALL_CATEGORIES_USED
 
 	def reset(self):
 		self.state = State()
 
 	def get_available_categories(self):
-		return [cat for cat, score in self.state.categories[self.state.turn].items() if score == -1]
+		return self.state.available_categories()
@@ -1,32 +1,80 @@
-import asyncio
+import argparse
 import os
 import threading
-import time
 import random
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
 import customtkinter as ctk
+from functools import lru_cache
 from PIL import Image
-from openai import OpenAI
 
+from ai_executor import AIDecisionExecutor, InlineDecisionExecutor
+from clock import TkClock, VirtualClock
+from dice_renderer import DiceRenderer
 from q_learning import QLearningYahtzee
+from training_metrics import TrainingMetrics
+from ui_dispatcher import UIDispatcher
 from constants import *
 from game import Yahtzee
-from utils import load_dice_image, load_and_resize_image, create_new_button, create_new_label, serialize_game_state, \
+from utils import load_and_resize_image, create_new_button, create_new_label, serialize_game_state, \
 	serialize_score_for_category
 from state import Category, categories, StateType, Action
 
-client = OpenAI(
-	base_url='http://localhost:11434/v1',
-	api_key='ollama',
-)
+
+@lru_cache(maxsize=1)
+def openai_client():
+	# The OpenAI package is slow to import, so the client is only built for the first chat message.
+	from openai import OpenAI
+
+	return OpenAI(
+		base_url='http://localhost:11434/v1',
+		api_key='ollama',
+	)
+
+
+def warm_start_ai(ai: QLearningYahtzee, num_episodes: int = AI_WARM_START_EPISODES) -> tuple[Future, list[float]]:
+	"""
+	Loads the saved policy, or trains and saves one, on a background thread.
+
+	Returns a future that completes once the AI can play and a one-item list that holds the
+	training progress between 0 and 1.
+	"""
+	progress = [0.0]
+
+	def report(record):
+		progress[0] = record["episode"] / num_episodes
+
+	def prepare():
+		if os.path.exists(Q_TABLE_FILE):
+			ai.load_q_table()
+		else:
+			metrics = TrainingMetrics(every=AI_WARM_START_PROGRESS_EVERY, sample_every=0, callback=report)
+			ai.train(num_episodes=num_episodes, checkpoint_every=100, resume=True, metrics=metrics)
+			ai.save_q_table()
+		progress[0] = 1.0
+
+	executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-warm-start")
+	future = executor.submit(prepare)
+	executor.shutdown(wait=False)
+	return future, progress
 
 
 class YahtzeeApp:
-	def __init__(self, root_param: ctk.CTk, game: Yahtzee):
+	def __init__(self, root_param: ctk.CTk, game: Yahtzee, ai_ready: Future | None = None,
+				 ai_progress: list[float] | None = None, clock=None, animation: str = ANIMATION_PROFILE):
 		self.game = game
+		self.ai_ready = ai_ready
+		self.ai_progress = ai_progress or [1.0]
 		self.root = root_param
 		self.root.title("Yahtzee")
 		self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+		self.clock = clock or TkClock(self.root)
+		self.animation = ANIMATION_PROFILES[animation]
+		self.ui = UIDispatcher(self.clock)
+		# On a virtual clock the AI decides inline, so whole games can be scripted deterministically.
+		executor = InlineDecisionExecutor if isinstance(self.clock, VirtualClock) else AIDecisionExecutor
+		self.ai_executor = executor(self.ui, self.clock)
+		self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 		self.score_labels = {}
 		self.ai_score_labels = {}
 		self.score_buttons = {}
@@ -50,9 +98,9 @@ class YahtzeeApp:
 		self.score_frame.place(x=980, y=40, width=261, height=740)
 
 		self.setup_score_frame()
-		self.dice_images = []
+		self.dice_renderer = DiceRenderer(self.canvas, self.toggle_dice_hold, self.toggle_dice_release)
 
-		self.draw_initial_dice()
+		self.draw_dice()
 
 		self.load_player_ai_photos()
 
@@ -62,7 +110,15 @@ class YahtzeeApp:
 		self.ai_action_label = create_new_label(self.root, "",
 												AI_ACTION_LABEL_X, AI_ACTION_LABEL_Y, 400, 20)
 
-		self.load_player_ai_photos()
+		self.ai_progress_label = create_new_label(self.root, "", AI_PROGRESS_LABEL_X, AI_PROGRESS_LABEL_Y,
+												  AI_PROGRESS_LABEL_WIDTH, AI_PROGRESS_LABEL_HEIGHT)
+		self.poll_ai_ready()
+
+		self.animation_choice = tk.StringVar(value=animation)
+		self.animation_menu = tk.OptionMenu(self.root, self.animation_choice, *ANIMATION_PROFILES,
+											command=self.set_animation_profile)
+		self.animation_menu.place(x=ANIMATION_MENU_X, y=ANIMATION_MENU_Y, width=ANIMATION_MENU_WIDTH,
+								  height=ANIMATION_MENU_HEIGHT)
 
 		self.open_chatbot_window()
 
@@ -134,10 +190,7 @@ class YahtzeeApp:
 			self.input_field.configure(state="disabled")
 			self.send_button.configure(state="disabled")
 
-			threading.Thread(target=self.process_message, args=(user_message,)).start()
-
-	def process_message(self, user_message):
-		try:
+			# The game state is read here on the Tk thread; the worker only talks to the model.
 			self.conversation_history.append({"role": "user", "content": user_message})
 			self.conversation_history.append(
 				{"role": "user", "content": f"Game State:\n{serialize_game_state(self.game.state)}"}
@@ -146,28 +199,48 @@ class YahtzeeApp:
 				{"role": "user",
 				 "content": f"Possible scores:\n{serialize_score_for_category(self.game.state.dice_on_table)}"}
 			)
+			# The bot bubble exists before the request, so the first streamed token can render immediately.
+			text_label = self.display_message("", is_user=False)
+			threading.Thread(target=self.process_message, args=(text_label,), daemon=True).start()
 
-			bot_response = self.get_bot_response()
-
-			self.display_message(bot_response, is_user=False)
+	def process_message(self, text_label):
+		try:
+			bot_response = self.get_bot_response(lambda text: self.ui.post(self.show_bot_text, text_label, text))
+			self.ui.post(self.show_bot_text, text_label, bot_response)
 		finally:
-			self.input_field.configure(state="normal")
-			self.send_button.configure(state="normal")
+			self.ui.post(self.enable_input)
+
+	def enable_input(self):
+		self.input_field.configure(state="normal")
+		self.send_button.configure(state="normal")
 
-	def get_bot_response(self):
+	def get_bot_response(self, on_text=None):
+		# Tokens are streamed and passed to on_text every CHAT_STREAM_BATCH_TOKENS, not per token.
+		parts = []
 		try:
-			response = client.chat.completions.create(
+			stream = openai_client().chat.completions.create(
 				model="llama3.2",
-				messages=self.conversation_history
+				messages=self.conversation_history,
+				stream=True
 			)
-			bot_response = response.choices[0].message.content.strip()
+			pending = 0
+			for chunk in stream:
+				token = chunk.choices[0].delta.content if chunk.choices else None
+				if not token:
+					continue
+				parts.append(token)
+				pending += 1
+				if on_text and (pending >= CHAT_STREAM_BATCH_TOKENS or len(parts) == 1):
+					on_text("".join(parts).lstrip())
+					pending = 0
+			bot_response = "".join(parts).strip()
 			self.conversation_history.append({"role": "assistant", "content": bot_response})
 			return bot_response
 		except Exception as e:
-			return f"Error: {str(e)}"
+			partial = "".join(parts).strip()
+			return f"{partial}\n\nError: {str(e)}" if partial else f"Error: {str(e)}"
 
 	def display_message(self, message, is_user=False):
-		self.chat_display._parent_canvas.yview_moveto(1)
 		message_frame = ctk.CTkFrame(self.chat_display, corner_radius=10)
 		message_frame.pack(fill="x", padx=10, pady=10, anchor="e" if is_user else "w")
 
@@ -179,33 +252,21 @@ class YahtzeeApp:
 			avatar_label.pack(side="left" if not is_user else "right", padx=20, pady=20)
 
 		text_label = ctk.CTkLabel(
-			message_frame, text="",
+			message_frame, text=message,
 			font=("Arial", 16), anchor="e" if is_user else "w",
 			wraplength=400
 		)
 		text_label.pack(side="right" if is_user else "left", padx=20)
+		self.chat_display._parent_canvas.yview_moveto(1)
+		return text_label
 
-		if is_user:
-			text_label.configure(text=message)
-		else:
-			for char in message:
-				text_label.configure(text=text_label.cget("text") + char)
-				text_label.update_idletasks()
-				self.root.after(random.choice([10, 20, 30, 40, 50]))
-				self.chat_display._parent_canvas.yview_moveto(1)
-
-		self.chat_display.update_idletasks()
+	def show_bot_text(self, text_label, text):
+		if text_label.cget("text") != text:
+			text_label.configure(text=text)
+			self.chat_display._parent_canvas.yview_moveto(1)
 
 	"""GUI"""
 
-	def draw_initial_dice(self) -> None:
-		for i in range(5):
-			dice_image = load_dice_image(i, size=(80, 80))
-			self.dice_images.append(dice_image)
-			x, y = DICE_POSITIONS_ON_TABLE[i]
-			dice_id = self.canvas.create_image(x, y, image=dice_image, anchor=tk.NW)
-			self.canvas.tag_bind(dice_id)
-
 	def load_player_ai_photos(self) -> None:
 		self.human_photo = load_and_resize_image(HUMAN_IMAGE_PATH, (100, 100))
 		self.canvas.create_image(460, 670, image=self.human_photo, anchor=tk.NW)
@@ -258,43 +319,26 @@ class YahtzeeApp:
 		self.create_total_score_row()
 
 	def draw_dice(self) -> None:
-		self.dice_images.clear()
 		self.game.state.dice_on_table = sorted(self.game.state.dice_on_table)
-		for i, value in enumerate(self.game.state.dice_on_table):
-			dice_image = load_dice_image(value, size=DICE_IMAGE_SIZE)
-			self.dice_images.append(dice_image)
-			x, y = DICE_POSITIONS_ON_TABLE[i]
-
-			dice_id = self.canvas.create_image(x, y, image=dice_image, anchor=tk.NW)
-			self.canvas.tag_bind(dice_id, "<Button-1>", lambda event, idx=i: self.toggle_dice_hold(idx))
-
 		self.game.state.dice_held = sorted(self.game.state.dice_held)
-		for i, value in enumerate(self.game.state.dice_held):
-			dice_image = load_dice_image(value, size=DICE_IMAGE_SIZE)
-			self.dice_images.append(dice_image)
-			x, y = DICE_POSITIONS_HOLD_HUMAN[i] if self.game.state.turn == 0 else DICE_POSITIONS_HOLD_AI[i]
-			dice_id = self.canvas.create_image(x, y, image=dice_image, anchor=tk.NW)
-			self.canvas.tag_bind(dice_id, "<Button-1>", lambda event, idx=i: self.toggle_dice_release(idx))
+		held_positions = DICE_POSITIONS_HOLD_HUMAN if self.game.state.turn == 0 else DICE_POSITIONS_HOLD_AI
+		self.dice_renderer.render(self.game.state.dice_on_table, self.game.state.dice_held, held_positions)
 
 	"""GUI"""
 
 	def start_roll_animation(self) -> None:
 		if self.game.state.rolls_left > 0:
 			self.roll_dice_button.config(state=tk.DISABLED) if self.game.state.turn == 0 else None
-			end_time = time.time() + 1
+			end_time = self.clock.now() + self.animation["roll"]
 
 			def roll_step():
-				if time.time() < end_time:
-					for i in range(len(self.game.state.dice_on_table)):
-						random_value = random.randint(1, 6)
-						dice_image = load_dice_image(random_value, DICE_IMAGE_SIZE)
-						self.canvas.create_image(DICE_POSITIONS_ON_TABLE[i], image=dice_image, anchor=tk.NW)
-						self.dice_images.append(dice_image)
-					self.root.after(DICE_ROLL_INTERVAL, roll_step)
+				if self.clock.now() < end_time:
+					self.dice_renderer.render_table([random.randint(1, 6) for _ in self.game.state.dice_on_table])
+					self.clock.after(self.animation["roll_interval"], roll_step)
 				else:
 					self.roll_dice()
 					if self.game.state.turn == 1:
-						self.root.after(DICE_ROLL_DURATION, self.ai_action)
+						self.clock.after(self.animation["ai_delay"], self.ai_action)
 
 			roll_step()
 
@@ -314,14 +358,12 @@ class YahtzeeApp:
 	def toggle_dice_hold(self, dice_index: int) -> None:
 		if dice_index < len(
 				self.game.state.dice_on_table) and self.game.state.turn == 0 and self.game.state.state_type != StateType.INITIAL:
-			dice_value = self.game.state.dice_on_table.pop(dice_index)
-			self.game.state.dice_held.append(dice_value)
+			self.game.hold(dice_index)
 			self.draw_dice()
 
 	def toggle_dice_release(self, dice_index: int) -> None:
 		if dice_index < len(self.game.state.dice_held) and self.game.state.turn == 0:
-			dice_value = self.game.state.dice_held.pop(dice_index)
-			self.game.state.dice_on_table.append(dice_value)
+			self.game.release(dice_index)
 			self.draw_dice()
 
 	def on_score_push(self, category) -> None:
@@ -357,12 +399,44 @@ class YahtzeeApp:
 	def update_rolls_left_label(self) -> None:
 		self.rolls_left_label.config(text=f"Rolls Left: {self.game.state.rolls_left}")
 
+	def poll_ai_ready(self) -> None:
+		if self.ai_ready is None or not self.ai_ready.done():
+			if self.ai_ready is not None:
+				self.ai_progress_label.config(text=f"AI warming up: {self.ai_progress[0]:.0%}")
+				self.clock.after(AI_READY_POLL_INTERVAL, self.poll_ai_ready)
+			return
+		error = self.ai_ready.exception()
+		self.ai_progress_label.config(text=f"AI failed to load: {error}" if error else "")
+
 	def ai_action(self) -> None:
-		action = self.game.ai.choose_action(self.game.state)
-		print(action)
+		if self.ai_ready is not None and not self.ai_ready.done():
+			self.clock.after(AI_READY_POLL_INTERVAL, self.ai_action)
+			return
+		state = self.game.state
+		self.request_ai_decision("choose_action", self.on_ai_action,
+								 lambda: self.game.ai.get_possible_actions(state, Action.ROLL)[0])
+
+	def request_ai_decision(self, choose: str, on_done, fallback) -> None:
+		# The decision runs on a fork of the AI and a copy of the state, so the Tk thread can keep
+		# drawing meanwhile. The AI only takes over the fork's RNG and previous action if the
+		# decision is used; a fallback leaves it as it was.
+		ai = self.game.ai
+		fork = ai.fork()
+
+		def on_decided(decision):
+			result, decided_by = decision
+			ai.adopt(decided_by) if decided_by is not None else None
+			on_done(result)
+
+		self.ai_executor.submit(lambda state: (getattr(fork, choose)(state), fork), self.game.state.copy(),
+								on_done=on_decided, fallback=lambda: (fallback(), None))
+
+	def on_ai_action(self, action: Action) -> None:
+		# The action actually played, which is the fallback's when the decision timed out.
+		self.game.ai.previous_action = action
 		match action:
 			case Action.ROLL:
-				self.root.after(DICE_ROLL_DURATION, self.start_roll_animation)
+				self.clock.after(self.animation["ai_delay"], self.start_roll_animation)
 			case Action.SCORE:
 				self.ai_score()
 			case Action.HOLD:
@@ -371,8 +445,11 @@ class YahtzeeApp:
 				self.ai_release_dice()
 
 	def ai_score(self):
+		available = self.game.get_available_categories()
+		self.request_ai_decision("choose_category", self.on_ai_score, lambda: available[0])
+
+	def on_ai_score(self, category: Category) -> None:
 		self.roll_dice_button.config(state=tk.NORMAL)
-		category = self.game.ai.choose_category(self.game.state)
 		score = self.game.score(category)
 		self.ai_action_label.config(text=f"AI scored {str(score)} in {category.name}!")
 		self.update_score_label(category, score)
@@ -380,32 +457,38 @@ class YahtzeeApp:
 		self.update_rolls_left_label()
 
 	def ai_release_dice(self) -> None:
-		dice_to_release = self.game.ai.choose_release(self.game.state)
+		self.request_ai_decision("choose_release", self.on_ai_release, list)
 
-		def release_dice_with_delay(index):
-			if index < len(dice_to_release):
-				die = dice_to_release[index]
-				die_index = self.game.state.dice_held.index(die)
-				self.game.release(die_index)
-				self.draw_dice()
-				self.root.after(DICE_HOLD_DURATION, release_dice_with_delay, index + 1)
-
-		release_dice_with_delay(0)
-		self.root.after(len(dice_to_release) * DICE_HOLD_DURATION + DICE_HOLD_DURATION, self.ai_action)
+	def on_ai_release(self, dice_to_release: list[int]) -> None:
+		self.move_ai_dice(dice_to_release, lambda: self.game.state.dice_held, self.game.release)
 
 	def ai_hold_dice(self) -> None:
-		dice_to_hold = self.game.ai.choose_hold(self.game.state)
+		self.request_ai_decision("choose_hold", self.on_ai_hold, list)
+
+	def on_ai_hold(self, dice_to_hold: list[int]) -> None:
+		self.move_ai_dice(dice_to_hold, lambda: self.game.state.dice_on_table, self.game.hold)
+
+	def move_ai_dice(self, dice: list[int], source, move) -> None:
+		delay = self.animation["hold"]
+		if not delay:
+			for die in dice:
+				move(source().index(die))
+			self.draw_dice()
+			self.clock.after(0, self.ai_action)
+			return
 
-		def hold_dice_with_delay(index):
-			if index < len(dice_to_hold):
-				die = dice_to_hold[index]
-				die_index = self.game.state.dice_on_table.index(die)
-				self.game.hold(die_index)
+		def move_with_delay(index):
+			if index < len(dice):
+				move(source().index(dice[index]))
 				self.draw_dice()
-				self.root.after(DICE_HOLD_DURATION, hold_dice_with_delay, index + 1)
+				self.clock.after(delay, move_with_delay, index + 1)
+
+		move_with_delay(0)
+		self.clock.after(len(dice) * delay + delay, self.ai_action)
 
-		hold_dice_with_delay(0)
-		self.root.after(len(dice_to_hold) * DICE_HOLD_DURATION + DICE_HOLD_DURATION, self.ai_action)
+	def set_animation_profile(self, name: str) -> None:
+		self.animation = ANIMATION_PROFILES[name]
+		self.animation_choice.set(name)
 
 	def end_turn(self) -> None:
 		if self.game.is_game_finished():
@@ -418,6 +501,7 @@ class YahtzeeApp:
 			self.draw_dice()
 
 	def reset_game(self) -> None:
+		self.ai_executor.cancel_all()
 		self.game.reset()
 		self.draw_dice()
 		for category in categories.keys():
@@ -435,12 +519,20 @@ class YahtzeeApp:
 					or isinstance(widget, tk.Label) and widget.cget("text") == "You won!":
 				widget.destroy()
 
+	def on_close(self) -> None:
+		self.ui.close()
+		self.ai_executor.shutdown()
+		self.root.destroy()
+
 
 if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Play Yahtzee against the AI.")
+	parser.add_argument("--animation", choices=list(ANIMATION_PROFILES), default=ANIMATION_PROFILE)
+	args = parser.parse_args()
+
 	root = ctk.CTk()
 	ai = QLearningYahtzee()
-	os.remove(Q_TABLE_FILE) if os.path.exists(Q_TABLE_FILE) else None
-	ai.train(num_episodes=1_000) if not os.path.exists(Q_TABLE_FILE) else ai.load_q_table()
+	ready, training_progress = warm_start_ai(ai)
 	game = Yahtzee(ai)
-	app = YahtzeeApp(root, game)
+	app = YahtzeeApp(root, game, ready, training_progress, animation=args.animation)
 	root.mainloop()
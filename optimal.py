@@ -0,0 +1,208 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from constants import *
+from game import YahtzeeAIBase
+from probability import ROLL_MATRIX, SUB_KEEPS
+from scoring import CATEGORY_COLUMNS, KEEP_INDEX, KEEPS, MULTISET_INDEX, SCORE_TABLE
+from state import State, Action, Category
+
+ALL_USED = (1 << len(Category)) - 1
+UPPER_CATEGORIES = [Category.ONES, Category.TWOS, Category.THREES, Category.FOURS, Category.FIVES, Category.SIXES]
+_UPPER_COLUMNS = [CATEGORY_COLUMNS[category] for category in UPPER_CATEGORIES]
+_EMPTY_KEEP = KEEP_INDEX[()]
+_ROLL_MATRIX = ROLL_MATRIX.astype(np.float32)
+
+
+def upper_width(upper_bonus: int) -> int:
+	# Without a bonus the upper subtotal cannot change any value, so it collapses to a single column.
+	return UPPER_BONUS_THRESHOLD + 1 if upper_bonus else 1
+
+
+def _next_upper(width: int) -> np.ndarray:
+	subtotals = np.arange(width)
+	return np.minimum(subtotals[None, None, :] + SCORE_TABLE[:, _UPPER_COLUMNS].T[:, :, None], width - 1)
+
+
+# Value of scoring every hand in every category, shaped (categories, hands, masks, upper subtotals).
+# Categories already used by a mask are left at -inf.
+def _category_values(values: np.ndarray, masks: np.ndarray, upper_bonus: int) -> np.ndarray:
+	width = values.shape[1]
+	next_upper = _next_upper(width)
+	subtotals = np.arange(width)
+	candidates = np.full((len(Category), SCORE_TABLE.shape[0], len(masks), width), -np.inf, dtype=np.float32)
+	for column in range(len(Category)):
+		bit = 1 << column
+		available = (masks & bit) == 0
+		if not available.any():
+			continue
+		next_values = values[masks[available] | bit]
+		scores = SCORE_TABLE[:, column].astype(np.float32)[:, None, None]
+		if column in _UPPER_COLUMNS and width > 1:
+			upper = next_upper[_UPPER_COLUMNS.index(column)]
+			future = next_values[:, upper].transpose(1, 0, 2)
+			bonus = upper_bonus * ((subtotals[None, :] < UPPER_BONUS_THRESHOLD) & (upper >= UPPER_BONUS_THRESHOLD))
+			candidates[column][:, available] = scores + future + bonus[:, None, :]
+		else:
+			candidates[column][:, available] = scores + next_values[None, :, :]
+	return candidates
+
+
+def _best_over_keeps(keep_values: np.ndarray) -> np.ndarray:
+	hand_values = keep_values[SUB_KEEPS[:, 0]]
+	for slot in range(1, SUB_KEEPS.shape[1]):
+		np.maximum(hand_values, keep_values[SUB_KEEPS[:, slot]], out=hand_values)
+	return hand_values
+
+
+def _solve_masks(values: np.ndarray, masks: np.ndarray, upper_bonus: int) -> np.ndarray:
+	width = values.shape[1]
+	hand_values = _category_values(values, masks, upper_bonus).max(axis=0).reshape(SCORE_TABLE.shape[0], -1)
+	for _ in range(2):
+		hand_values = _best_over_keeps(_ROLL_MATRIX @ hand_values)
+	return (_ROLL_MATRIX[_EMPTY_KEEP] @ hand_values).reshape(len(masks), width)
+
+
+def solve(upper_bonus: int = UPPER_BONUS, workers: int | None = None, chunk_size: int = 64) -> np.ndarray:
+	"""
+	Solves solitaire Yahtzee by retrograde dynamic programming.
+
+	Returns the expected final score gained from the start of a turn for every used-category
+	mask and upper-section subtotal. Masks with the same number of used categories only depend
+	on the previous layer, so each layer is split into chunks that are solved in parallel.
+	"""
+	width = upper_width(upper_bonus)
+	values = np.zeros((ALL_USED + 1, width), dtype=np.float32)
+	masks = np.arange(ALL_USED + 1)
+	popcounts = np.array([bin(mask).count("1") for mask in masks])
+	workers = workers or os.cpu_count() or 1
+
+	with ProcessPoolExecutor(max_workers=workers) if workers > 1 else _InlineExecutor() as executor:
+		for used in range(len(Category) - 1, -1, -1):
+			layer = masks[popcounts == used]
+			chunks = [layer[i:i + chunk_size] for i in range(0, len(layer), chunk_size)]
+			results = executor.map(_solve_masks, [values] * len(chunks), chunks, [upper_bonus] * len(chunks))
+			for chunk, result in zip(chunks, results):
+				values[chunk] = result
+	return values
+
+
+class _InlineExecutor:
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		return False
+
+	@staticmethod
+	def map(function, *iterables):
+		return map(function, *iterables)
+
+
+def save_values(values: np.ndarray, path: str = OPTIMAL_TABLE_FILE):
+	np.save(path, values.astype(np.float32))
+
+
+def load_values(path: str = OPTIMAL_TABLE_FILE) -> np.ndarray:
+	return np.load(path, mmap_mode='r')
+
+
+def load_or_solve(path: str = OPTIMAL_TABLE_FILE) -> np.ndarray:
+	if os.path.exists(path):
+		return load_values(path)
+	values = solve()
+	save_values(values, path)
+	return values
+
+
+def _multiset_difference(dice: list[int], other: list[int] | tuple[int, ...]) -> list[int]:
+	remaining = list(dice)
+	for die in other:
+		if die in remaining:
+			remaining.remove(die)
+	return remaining
+
+
+class OptimalYahtzeeAI(YahtzeeAIBase):
+	def __init__(self, values: np.ndarray | None = None, path: str = OPTIMAL_TABLE_FILE, upper_bonus: int = UPPER_BONUS):
+		self.values = np.asarray(values if values is not None else load_or_solve(path))
+		self.upper_bonus = upper_bonus
+		self.turn_policy = lru_cache(maxsize=OPTIMAL_TURN_CACHE_SIZE)(self._solve_turn)
+
+	def _solve_turn(self, mask: int, upper: int) -> tuple[list[int], list[list[int]]]:
+		masks = np.array([mask])
+		candidates = self._category_values_for(masks, upper)
+		best_categories = candidates.argmax(axis=0).tolist()
+		hand_values = candidates.max(axis=0)
+		best_keeps = [[]]
+		for _ in range(2):
+			keep_values = ROLL_MATRIX @ hand_values
+			options = keep_values[SUB_KEEPS]
+			best_keeps.append(SUB_KEEPS[np.arange(len(SUB_KEEPS)), options.argmax(axis=1)].tolist())
+			hand_values = options.max(axis=1)
+		return best_categories, best_keeps
+
+	def _category_values_for(self, masks: np.ndarray, upper: int) -> np.ndarray:
+		values = self.values
+		candidates = _category_values(values, masks, self.upper_bonus)[:, :, 0, min(upper, values.shape[1] - 1)]
+		return candidates.astype(np.float64)
+
+	@staticmethod
+	def _position(state: State) -> tuple[int, int]:
+		mask = 0
+		upper = 0
+		for category, score in state.categories[state.turn].items():
+			if score != -1:
+				mask |= 1 << CATEGORY_COLUMNS[category]
+				if category in UPPER_CATEGORIES:
+					upper += score
+		return mask, min(upper, UPPER_BONUS_THRESHOLD)
+
+	def target_keep(self, state: State) -> tuple[int, ...]:
+		hand = MULTISET_INDEX[tuple(sorted(state.dice_on_table + state.dice_held))]
+		best_keeps = self.turn_policy(*self._position(state))[1]
+		return KEEPS[best_keeps[min(state.rolls_left, 2)][hand]]
+
+	def choose_action(self, state: State) -> Action:
+		if state.rolls_left == 3:
+			return Action.ROLL
+		if state.rolls_left == 0:
+			return Action.SCORE
+
+		target = self.target_keep(state)
+		if len(target) == 5:
+			return Action.SCORE
+		if _multiset_difference(state.dice_held, target):
+			return Action.RELEASE
+		if _multiset_difference(list(target), state.dice_held):
+			return Action.HOLD
+		return Action.ROLL
+
+	def choose_category(self, state: State) -> Category:
+		hand = MULTISET_INDEX[tuple(sorted(state.dice_on_table + state.dice_held))]
+		best_categories = self.turn_policy(*self._position(state))[0]
+		return list(Category)[best_categories[hand]]
+
+	def choose_hold(self, state: State) -> list[int]:
+		return _multiset_difference(list(self.target_keep(state)), state.dice_held)
+
+	def choose_release(self, state: State) -> list[int]:
+		return _multiset_difference(state.dice_held, self.target_keep(state))
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Solve solitaire Yahtzee and write the optimal value table.")
+	parser.add_argument("--output", default=OPTIMAL_TABLE_FILE)
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument("--upper-bonus", type=int, default=UPPER_BONUS)
+	args = parser.parse_args()
+
+	start = time.perf_counter()
+	solved_values = solve(upper_bonus=args.upper_bonus, workers=args.workers)
+	save_values(solved_values, args.output)
+	print(f"Solved in {time.perf_counter() - start:.1f}s, expected score {solved_values[0, 0]:.2f}")
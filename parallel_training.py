@@ -0,0 +1,73 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from constants import *
+from q_learning import QLearningYahtzee
+from q_table import QTable, merge_tables, table_changes
+
+
+def _train_shard(path: str, epsilon: float, num_episodes: int, max_turns: int, num_envs: int, seed: int):
+	# The round's base table is mapped copy-on-write, and only the rows this shard changed go back.
+	agent = QLearningYahtzee()
+	agent.q_table = QTable.load(path)
+	agent.epsilon = epsilon
+	rewards = agent.train_batched(num_episodes, max_turns, num_envs, seed=seed, verbose=False)
+	return table_changes(agent.q_table, QTable.load(path, "r")), agent.epsilon, rewards
+
+
+def train_parallel(agent: QLearningYahtzee, num_episodes: int = 100_000, workers: int | None = None,
+				   merge_every: int = PARALLEL_MERGE_EPISODES, max_turns: int = 12, num_envs: int = VEC_ENV_SIZE,
+				   seed: int | None = None, weighting: str = "visits") -> list[float]:
+	"""
+	Trains `agent` on shards of episodes spread over a process pool.
+
+	Every worker has its own seed stream and epsilon schedule. After each worker has played
+	`merge_every` episodes the rows the workers changed are merged into `agent.q_table` and the next
+	round starts from the merged table, which the workers map from a file instead of receiving a copy.
+	"""
+	workers = workers or os.cpu_count() or 1
+	seed_sequences = np.random.SeedSequence(seed).spawn(workers)
+	epsilons = [agent.epsilon] * workers
+	rewards_per_episode = []
+
+	with ProcessPoolExecutor(max_workers=workers) as executor, tempfile.TemporaryDirectory() as directory:
+		path = os.path.join(directory, Q_TABLE_FILE)
+		while len(rewards_per_episode) < num_episodes:
+			start = time.perf_counter()
+			# Each round plays at most merge_every episodes per worker, split so the shards add up exactly.
+			round_episodes = min(merge_every * workers, num_episodes - len(rewards_per_episode))
+			shards = [round_episodes // workers + (worker < round_episodes % workers) for worker in range(workers)]
+			agent.q_table.save(path)
+			futures = {worker: executor.submit(_train_shard, path, epsilons[worker], shards[worker], max_turns,
+											   num_envs, int(seed_sequences[worker].spawn(1)[0].generate_state(1)[0]))
+					   for worker in range(workers) if shards[worker]}
+			results = {worker: future.result() for worker, future in futures.items()}
+
+			merge_tables(agent.q_table, [result[0] for result in results.values()], weighting)
+			for worker, result in results.items():
+				epsilons[worker] = result[1]
+				rewards_per_episode.extend(result[2])
+			print(f"Episode {len(rewards_per_episode)}: States = {len(agent.q_table)}, "
+				  f"Epsilon = {max(epsilons)}, Round time = {time.perf_counter() - start:.1f}s")
+
+	agent.epsilon = max(epsilons)
+	return rewards_per_episode
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Train the Q-learning AI across several processes.")
+	parser.add_argument("--episodes", type=int, default=100_000)
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument("--merge-every", type=int, default=PARALLEL_MERGE_EPISODES)
+	parser.add_argument("--seed", type=int, default=None)
+	parser.add_argument("--weighting", choices=["visits", "mean"], default="visits")
+	args = parser.parse_args()
+
+	ai = QLearningYahtzee()
+	train_parallel(ai, args.episodes, args.workers, args.merge_every, seed=args.seed, weighting=args.weighting)
+	ai.save_q_table()
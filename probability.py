@@ -0,0 +1,81 @@
+from itertools import combinations, combinations_with_replacement
+from math import factorial
+
+import numpy as np
+
+from scoring import CATEGORY_COLUMNS, FACES, KEEP_INDEX, KEEP_SCORE_TABLE, KEEPS, MULTISET_INDEX, MULTISETS
+from state import Category
+
+MAX_ROLLS = 3
+
+
+def _outcome_probability(outcome: tuple[int, ...]) -> float:
+	arrangements = factorial(len(outcome))
+	for face in set(outcome):
+		arrangements //= factorial(outcome.count(face))
+	return arrangements / 6 ** len(outcome)
+
+
+def _build_roll_matrix() -> np.ndarray:
+	matrix = np.zeros((len(KEEPS), len(MULTISETS)))
+	for keep_index, keep in enumerate(KEEPS):
+		for outcome in combinations_with_replacement(FACES, 5 - len(keep)):
+			final = tuple(sorted(keep + outcome))
+			matrix[keep_index, MULTISET_INDEX[final]] += _outcome_probability(outcome)
+	return matrix
+
+
+def _build_sub_keeps() -> np.ndarray:
+	sub_keeps = np.zeros((len(MULTISETS), 32), dtype=np.int16)
+	for hand_index, hand in enumerate(MULTISETS):
+		keeps = sorted({KEEP_INDEX[keep] for size in range(6) for keep in combinations(hand, size)})
+		sub_keeps[hand_index] = keeps + [keeps[-1]] * (32 - len(keeps))
+	return sub_keeps
+
+
+# ROLL_MATRIX[k, f] is the probability that keeping KEEPS[k] and rolling the other dice once ends on MULTISETS[f].
+ROLL_MATRIX = _build_roll_matrix()
+# SUB_KEEPS[f] lists the KEEPS indices of every sub-hand of MULTISETS[f], padded with repeats.
+SUB_KEEPS = _build_sub_keeps()
+
+_HAND_ROWS = np.array([KEEP_INDEX[hand] for hand in MULTISETS])
+_IS_HAND = np.array([len(keep) == 5 for keep in KEEPS])
+
+
+# Row r holds the value of every KEEPS entry with r rolls left when each category is chased on its own:
+# full hands may still choose what to keep, partial hands are the dice kept before the others are rolled.
+def _chase_values(final_values: np.ndarray) -> np.ndarray:
+	values = np.zeros((MAX_ROLLS + 1,) + final_values.shape)
+	values[0] = final_values
+	hand_values = final_values[_HAND_ROWS]
+	for rolls in range(1, MAX_ROLLS + 1):
+		keep_values = ROLL_MATRIX @ hand_values
+		hand_values = keep_values[SUB_KEEPS].max(axis=1)
+		values[rolls] = keep_values
+		values[rolls, _HAND_ROWS] = hand_values
+	return values
+
+
+# Indexed by [rolls_left, KEEPS index, category column].
+COMPLETION_PROBABILITIES = np.minimum(_chase_values((KEEP_SCORE_TABLE > 0) & _IS_HAND[:, None]), 1.0)
+EXPECTED_SCORES = _chase_values(KEEP_SCORE_TABLE * _IS_HAND[:, None])
+
+
+def _position(dice: list | tuple, rolls_left: int) -> tuple[int, int]:
+	return min(max(rolls_left, 0), MAX_ROLLS), KEEP_INDEX[tuple(sorted(dice))]
+
+
+def calculate_probability(category: Category, dice: list | tuple, rolls_left: int) -> float:
+	rolls, keep = _position(dice, rolls_left)
+	return float(COMPLETION_PROBABILITIES[rolls, keep, CATEGORY_COLUMNS[category]])
+
+
+def expected_score(category: Category, dice: list | tuple, rolls_left: int) -> float:
+	rolls, keep = _position(dice, rolls_left)
+	return float(EXPECTED_SCORES[rolls, keep, CATEGORY_COLUMNS[category]])
+
+
+def expected_total(dice: list | tuple, rolls_left: int, categories: list[Category]) -> float:
+	rolls, keep = _position(dice, rolls_left)
+	row = EXPECTED_SCORES[rolls, keep]
+	return float(sum(row[CATEGORY_COLUMNS[category]] for category in categories))
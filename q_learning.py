@@ -1,15 +1,24 @@
 import csv
 import os
+import pickle
 import random
+import time
 from abc import ABC
+from ast import literal_eval
+from functools import lru_cache
 
-import pandas as pd
-
-import matplotlib.pyplot as plt
+import numpy as np
 
+from dice import DiceSource
 from game import Yahtzee, YahtzeeAIBase
 from state import State, Action, Category, categories
-from utils import calculate_probability, calculate_score
+from probability import calculate_probability, expected_total
+from q_table import (QTable, N_ACTIONS, ROLL_ACTION, HOLD_ACTIONS, RELEASE_ACTIONS, category_mask, decode_action,
+					 decode_state, encode_action, encode_parts, encode_state, legal_mask)
+from scoring import CATEGORY_COLUMNS, calculate_score
+from trajectory_log import TrajectoryLogger
+from training_metrics import TrainingMetrics
+from vec_env import VecEnv
 from constants import *
 
 
@@ -27,109 +36,88 @@ class QAction:
 				self.action_value = action_value if action_value else None
 
 	def __eq__(self, other):
-		return True
+		return self.action == other.action and self.action_value == other.action_value
 
 	def __hash__(self):
-		return hash(False)
+		return hash((self.action, self.action_value))
 
 	def __str__(self):
 		return f"Action: {self.action}, Action Value: {self.action_value}"
 
 
 class StateKey:
-	def __init__(self, state: State, available_categories=None):
+	def __init__(self, state: State):
 		self.dice_held = tuple(sorted(die for die in state.dice_held)) if state.dice_held else ()
 		self.dice_on_table = tuple(sorted(die for die in state.dice_on_table)) if state.dice_on_table else ()
 		self.rolls_left = state.rolls_left
-		self.available_categories = [cat for cat, score in state.categories[state.turn].items() if
-									 score == -1 and not available_categories]
+		self.available_categories = state.available_categories()
+		self.id = encode_state(state)
 
 	def __eq__(self, other):
-		return (self.dice_held == other.dice_held and
-				self.dice_on_table == other.dice_on_table and
-				self.rolls_left == other.rolls_left and
-				self.available_categories == other.available_categories)
+		return self.id == other.id
 
 	def __hash__(self):
-		return hash((self.dice_held, self.dice_on_table, self.rolls_left))
+		return hash(self.id)
 
 	def __str__(self):
 		return f"StateKey: Dice Held:{self.dice_held}, Dice On Table:{self.dice_on_table}, Rolls Left:{self.rolls_left}"
 
 
+def read_csv_q_table(path: str = Q_TABLE_CSV_FILE) -> QTable:
+	q_table = QTable()
+	with open(path, newline='') as file:
+		for row in csv.DictReader(file):
+			dice_held = literal_eval(row["Dice Held"])
+			dice_on_table = literal_eval(row["Dice On Table"])
+			available_categories = literal_eval(row["Available Categories"])
+			mask = category_mask({cat: -1 if cat_str in available_categories else 0
+								  for cat_str, cat in categories.items()})
+			state_id = encode_parts(dice_on_table, dice_held, int(row["Rolls Left"]), mask)
+			action = Action.to_action(row["Action"])
+			action_value = row["Action Value"]
+			if action == Action.SCORE:
+				action_value = categories[action_value.removeprefix("Category.")]
+			elif action_value:
+				action_value = literal_eval(action_value)
+			action_id = encode_action(action, action_value, list(dice_on_table), list(dice_held))
+			q_table.set(state_id, action_id, float(row["Q-Value"]))
+	return q_table
+
+
+def convert_csv_q_table(csv_path: str = Q_TABLE_CSV_FILE, output_path: str = Q_TABLE_FILE):
+	read_csv_q_table(csv_path).save(output_path)
+
+
 class QLearningYahtzee(YahtzeeAIBase, ABC):
-	def __init__(self):
+	def __init__(self, seed: int | None = None):
+		self.rng = random.Random(seed)
 		self.previous_action: Action = Action.ROLL
 		self.alpha = ALPHA
 		self.gamma = GAMMA
 		self.epsilon = EPSILON
 		self.epsilon_decay = EPSILON_DECAY
 		self.min_epsilon = MIN_EPSILON
-		self.q_table: dict[StateKey, dict[QAction, float]] = {}
-
-	def get_q_value(self, state: State, q_action: QAction):
-		state_key = StateKey(state)
-		if state_key not in self.q_table:
-			self.add_missing_state_to_table(state)
-		return self.q_table[state_key][q_action]
+		self.q_table = QTable()
 
-	def add_missing_state_to_table(self, state: State):
-		state_key = StateKey(state)
-		if state_key not in self.q_table:
-			self.q_table[state_key] = {}
-
-		action = random.choice(self.get_possible_actions(state, self.previous_action))
-		match action:
-			case Action.ROLL:
-				if state.rolls_left == 0:
-					return
-				self.q_table[state_key][QAction(action)] = 0
-			case Action.HOLD:
-				dice_len = len(state.dice_on_table)
-				dice_to_hold_len = random.randint(1, max(1, dice_len - 1))
-				dice_to_hold = random.sample(state.dice_on_table, dice_to_hold_len)
-				self.q_table[state_key][QAction(action, action_value=tuple(dice_to_hold))] = 0
-			case Action.RELEASE:
-				dice_len = len(state.dice_held)
-				dice_to_release_len = random.randint(1, max(1, dice_len - 1))
-				dice_to_release = random.sample(state.dice_held, dice_to_release_len)
-				self.q_table[state_key][QAction(action, action_value=tuple(dice_to_release))] = 0
-			case Action.SCORE:
-				random_category = random.choice(
-					[cat for cat, score in state.categories[state.turn].items() if score == -1])
-				category_score = calculate_score(random_category, state.dice_on_table + state.dice_held)
-				self.q_table[state_key][QAction(action, action_value=random_category)] = category_score
+	def legal_actions(self, state: State) -> np.ndarray:
+		return legal_mask(state.rolls_left, self.previous_action, len(state.dice_on_table), len(state.dice_held),
+						  state.used[state.turn])
 
-	def update_q_value(self, state: State, q_action: QAction, reward: int,
-					   next_state: State, writer=None):
-		state_key = StateKey(state)
-		next_state_key = StateKey(next_state)
-
-		if next_state_key not in self.q_table:
-			self.add_missing_state_to_table(next_state)
-
-		if q_action not in self.q_table[state_key]:
-			self.q_table[state_key][q_action] = 0
-
-		best_next_q = 0
-		if next_state_key in self.q_table:
-			for next_q_action, q_value in self.q_table[next_state_key].items():
-				best_next_q = max(best_next_q, q_value)
+	def get_q_value(self, state: State, q_action: QAction):
+		action_id = encode_action(q_action.action, q_action.action_value, state.dice_on_table, state.dice_held)
+		return self.q_table.get(encode_state(state), action_id)
 
-		current_q = self.get_q_value(state, q_action)
+	def update_q_value(self, state_id: int, action_id: int, reward: float, next_state_id: int,
+					   next_legal: np.ndarray):
+		best_next_q = max(0.0, self.q_table.best_value(next_state_id, next_legal))
+		current_q = self.q_table.get(state_id, action_id)
 		new_q = current_q + self.alpha * (reward + self.gamma * best_next_q - current_q)
-		self.q_table[state_key][q_action] = new_q
-
-		available_categories_str = [str_cat for str_cat, cat in categories.items() if
-									cat in state_key.available_categories]
-		writer.writerow([state_key.dice_held, state_key.dice_on_table, state_key.rolls_left, available_categories_str,
-						 q_action.action, q_action.action_value, new_q]) if writer else None
-
+		self.q_table.set(state_id, action_id, new_q)
 		return new_q
 
 	def choose_action(self, state: State):
-		if random.uniform(0, 1) < self.epsilon:
-			action = random.choice(self.get_possible_actions(state, self.previous_action))
+		if self.rng.uniform(0, 1) < self.epsilon:
+			action = self.rng.choice(self.get_possible_actions(state, self.previous_action))
 			self.previous_action = action
 			return action
 		else:
@@ -138,43 +126,28 @@ class QLearningYahtzee(YahtzeeAIBase, ABC):
 			return action
 
 	def choose_informed_action(self, state: State):
-		state_key = StateKey(state)
-		if state_key not in self.q_table:
-			self.add_missing_state_to_table(state)
-
-		action = max(self.q_table[state_key], key=self.q_table[state_key].get).action
-		if action not in self.get_possible_actions(state, self.previous_action):
-			self.q_table[state_key].pop(max(self.q_table[state_key], key=self.q_table[state_key].get))
-			return self.choose_informed_action(state)
-
-		return action
-
-	@staticmethod
-	def random_dice_combination(state: State) -> list[int]:
-		dice_len = len(state.dice_on_table)
-		random_dice_len = random.randint(1, max(1, dice_len - 1))
-		random_dice = random.sample(state.dice_on_table, random_dice_len)
+		legal = self.legal_actions(state)
+		action_id = self.q_table.best_action(encode_state(state), legal)
+		if action_id is None:
+			return self.rng.choice(self.get_possible_actions(state, self.previous_action))
+		return decode_action(action_id, state.dice_on_table, state.dice_held)[0]
+
+	def random_dice_combination(self, dice: list[int]) -> list[int]:
+		dice_len = len(dice)
+		random_dice_len = self.rng.randint(1, max(1, dice_len - 1))
+		random_dice = self.rng.sample(dice, random_dice_len)
 		return random_dice
 
 	def choose_hold_or_release(self, state: State, chosen_action: Action):
-		state_key = StateKey(state)
-		if state_key not in self.q_table:
-			self.add_missing_state_to_table(state)
-
-		action_value = {action: q_value for action, q_value in self.q_table[state_key].items() if
-						action.action == chosen_action}
-		if not action_value:
-			return self.random_dice_combination(state)
-
-		max_q_action = max(action_value, key=action_value.get)
-		if max_q_action.action_value is None:
-			return self.random_dice_combination(state)
+		dice = state.dice_on_table if chosen_action == Action.HOLD else state.dice_held
+		first = HOLD_ACTIONS if chosen_action == Action.HOLD else RELEASE_ACTIONS
+		legal = np.zeros(N_ACTIONS, dtype=bool)
+		legal[first + 1:first + (1 << len(dice))] = True
 
-		chosen_action_value = [die for die in max_q_action.action_value]
-		if not chosen_action_value:
-			return self.random_dice_combination(state)
-
-		return chosen_action_value
+		action_id = self.q_table.best_action(encode_state(state), legal)
+		if action_id is None:
+			return self.random_dice_combination(dice)
+		return list(decode_action(action_id, state.dice_on_table, state.dice_held)[1])
 
 	def choose_hold(self, state: State) -> list[int]:
 		return self.choose_hold_or_release(state, Action.HOLD)
@@ -183,169 +156,282 @@ class QLearningYahtzee(YahtzeeAIBase, ABC):
 		return self.choose_hold_or_release(state, Action.RELEASE)
 
 	def choose_category(self, state: State) -> Category | None:
-		state_key = StateKey(state)
-		if state_key not in self.q_table:
-			self.add_missing_state_to_table(state)
-
-		max_q_value_category = max(self.q_table[state_key], key=self.q_table[state_key].get).action_value
-		return max_q_value_category
+		legal = legal_mask(0, Action.ROLL, 0, 0, state.used[state.turn])
+		action_id = self.q_table.best_action(encode_state(state), legal)
+		if action_id is None:
+			available_categories = state.available_categories()
+			return self.rng.choice(available_categories) if available_categories else None
+		return decode_action(action_id, state.dice_on_table, state.dice_held)[1]
 
 	@staticmethod
 	def evaluate_hold(dice_held, dice_to_hold, remaining_rolls, scoring_categories):
-		expected_scores = []
 		new_dice_held = dice_held + list(dice_to_hold)
-		for category in scoring_categories:
-			probability = calculate_probability(category, new_dice_held, remaining_rolls)
-			potential_score = calculate_score(category, new_dice_held)
-			expected_scores.append(probability * potential_score)
-		return sum(expected_scores) + len(set(dice_to_hold)) * 0.1
+		return expected_total(new_dice_held, remaining_rolls, scoring_categories) + len(set(dice_to_hold)) * 0.1
 
 	@staticmethod
 	def evaluate_release(dice_held, dice_to_release, remaining_rolls, scoring_categories):
 		remaining_dice = [die for die in dice_held if die not in dice_to_release]
-		expected_scores = []
-		for category in scoring_categories:
-			probability = calculate_probability(category, remaining_dice, remaining_rolls)
-			potential_score = calculate_score(category, remaining_dice)
-			expected_scores.append(probability * potential_score)
-		return sum(expected_scores) - len(dice_to_release) * 0.1
-
-	def save_q_table(self):
-		with open(Q_TABLE_FILE, mode='w', newline='') as file:
-			writer = csv.writer(file)
-			writer.writerow(
-				["Dice Held", "Dice On Table", "Rolls Left", "Available Categories", "Action", "Action Value",
-				 "Q-Value"])
-			for state_key, q_values in self.q_table.items():
-				available_categories_str = [str_cat for str_cat, cat in categories.items() if
-											cat in state_key.available_categories]
-				for q_action, q_value in q_values.items():
-					writer.writerow(
-						[state_key.dice_held, state_key.dice_on_table, state_key.rolls_left, available_categories_str,
-						 q_action.action, q_action.action_value, q_value])
-
-	def load_q_table(self):
-		if os.path.exists(Q_TABLE_FILE):
-			df = pd.read_csv(Q_TABLE_FILE)
-			for index, row in df.iterrows():
-				available_categories = [cat for cat_str, cat in categories.items() if
-										cat_str in row["Available Categories"]]
-				state_key = StateKey(State(row["Dice Held"], row["Dice On Table"], row["Rolls Left"]),
-									 available_categories)
-				action_value = row["Action Value"] if not pd.isna(row["Action Value"]) else None
-				action = Action.to_action(row["Action"])
-				q_action = QAction(action, action_value)
-				if state_key not in self.q_table:
-					self.q_table[state_key] = {}
-				self.q_table[state_key][q_action] = row["Q-Value"]
+		return expected_total(remaining_dice, remaining_rolls, scoring_categories) - len(dice_to_release) * 0.1
 
-	def print_q_table(self):
-		i = 0
-		for state_key, q_values in self.q_table.items():
-			print(f"State:{i}")
-			print("Dice Held:", state_key.dice_held)
-			print("Dice On Table:", state_key.dice_on_table)
-			print("Rolls Left:", state_key.rolls_left)
-			print(f"Q-Values{i}:")
-			j = 0
-			for q_action, q_value in q_values.items():
-				print(f"Action{j}: ", q_action.action)
-				print(f"Action Value: ", q_action.action_value)
-				print("Q-Value: ", q_value)
-				j += 1
-			i += 1
+	def save_q_table(self, path: str = Q_TABLE_FILE):
+		self.q_table.save(path)
 
-	def evaluate_reward(self, state: State, q_action: QAction, scoring_categories: list[Category]) -> float:
-		reward = 0.0
+	def load_q_table(self, path: str = Q_TABLE_FILE, mmap_mode: str = "c"):
+		if os.path.exists(path):
+			self.q_table = QTable.load(path, mmap_mode)
 
-		match q_action.action:
-			case Action.ROLL:
-				reward += 0.1 * state.rolls_left
-			case Action.HOLD:
-				reward += self.evaluate_hold(state.dice_held, q_action.action_value, state.rolls_left,
-											 scoring_categories)
-			case Action.RELEASE:
-				reward += self.evaluate_release(state.dice_held, q_action.action_value, state.rolls_left,
-												scoring_categories)
-			case Action.SCORE:
-				achieved_score = calculate_score(q_action.action_value, state.dice_on_table + state.dice_held)
-				reward += achieved_score * 2
+	def print_q_table(self):
+		for row, state_id in enumerate(self.q_table.arrays()[0].tolist()):
+			dice_on_table, dice_held, rolls_left, _ = decode_state(state_id)
+			print(f"State:{row}")
+			print("Dice Held:", tuple(dice_held))
+			print("Dice On Table:", tuple(dice_on_table))
+			print("Rolls Left:", rolls_left)
+			print(f"Q-Values{row}:")
+			for j, action_id in enumerate(np.flatnonzero(self.q_table.visits[row])):
+				action, action_value = decode_action(int(action_id), dice_on_table, dice_held)
+				print(f"Action{j}: ", action)
+				print(f"Action Value: ", action_value)
+				print("Q-Value: ", self.q_table.values[row, action_id])
 
+	def evaluate_reward(self, state: State, q_action: QAction, scoring_categories: list[Category]) -> float:
+		available = 0
 		for category in scoring_categories:
-			probability = calculate_probability(category, state.dice_on_table + state.dice_held, state.rolls_left)
-			potential_score = calculate_score(category, state.dice_on_table + state.dice_held)
-			reward += probability * potential_score * 0.5
+			available |= 1 << CATEGORY_COLUMNS[category]
+		return _evaluate_reward(tuple(sorted(state.dice_on_table)), tuple(sorted(state.dice_held)), state.rolls_left,
+								available, q_action.action, q_action.action_value)
 
-		if state.rolls_left == 0 and not state.dice_held:
-			reward -= 0.5
-
-		high_value = [Category.YAHTZEE, Category.LARGE_STRAIGHT, Category.FOUR_OF_A_KIND]
-		for category in high_value:
-			probability = calculate_probability(category, state.dice_held, state.rolls_left)
-			reward += probability * 2
-
-		return reward
+	@staticmethod
+	def reward_cache_info():
+		return _evaluate_reward.cache_info()
 
-	def train(self, num_episodes=1000, max_turns=12):
+	@staticmethod
+	def clear_reward_cache():
+		_evaluate_reward.cache_clear()
+
+	def save_checkpoint(self, path: str = CHECKPOINT_FILE, **progress):
+		"""
+		Writes the Q-table, epsilon and the state of this agent's own generator (self.rng, not the global
+		random module) together with the caller's progress to one file.
+		The file is replaced atomically, so an interrupted save leaves the previous checkpoint intact.
+		"""
+		keys, values, visits = self.q_table.arrays()
+		checkpoint = {
+			"version": CHECKPOINT_VERSION,
+			"q_table": (np.array(keys), np.array(values), np.array(visits)),
+			"epsilon": self.epsilon,
+			"previous_action": self.previous_action,
+			"random_state": self.rng.getstate(),
+			**progress,
+		}
+		temporary_path = f"{path}.tmp"
+		with open(temporary_path, "wb") as file:
+			pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(temporary_path, path)
+
+	def load_checkpoint(self, path: str = CHECKPOINT_FILE) -> dict:
+		with open(path, "rb") as file:
+			checkpoint = pickle.load(file)
+		if checkpoint.get("version") != CHECKPOINT_VERSION:
+			raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} training checkpoint")
+		self.q_table = QTable.from_arrays(*checkpoint.pop("q_table"))
+		self.epsilon = checkpoint.pop("epsilon")
+		self.previous_action = checkpoint.pop("previous_action")
+		self.rng.setstate(checkpoint.pop("random_state"))
+		return checkpoint
+
+	def train(self, num_episodes=1000, max_turns=12, log_dir=None, log_every=TRAJECTORY_LOG_EVERY,
+			  checkpoint_path=CHECKPOINT_FILE, checkpoint_every=0, resume=False, metrics: TrainingMetrics | None = None):
 		rewards_per_episode = []
-		file = open(Q_TABLE_FILE, mode='w', newline='')
-		writer = csv.writer(file)
-		writer.writerow(
-			["Dice Held", "Dice On Table", "Rolls Left", "Available Categories", "Action", "Action Value", "Q-Value"])
-
-		for episode in range(num_episodes):
-			game = Yahtzee(self)
+		start_episode = 0
+		dice = DiceSource(self.rng.getrandbits(64))
+		if resume and os.path.exists(checkpoint_path):
+			progress = self.load_checkpoint(checkpoint_path)
+			start_episode = progress["episode"]
+			rewards_per_episode = progress["rewards"]
+			dice = progress["dice"]
+		logger = TrajectoryLogger(log_dir, log_every) if log_dir and log_every else None
+
+		for episode in range(start_episode, num_episodes):
+			game = Yahtzee(self, dice)
 			state = game.state
-			nr_of_rolls_per_turn = 0
 			total_reward = 0
+			timed = metrics is not None and metrics.sampled(episode)
+			metrics.start_episode(episode) if metrics else None
 
 			for turn in range(max_turns):
 				reward = 0
 				available_categories = game.get_available_categories()
+				state_id = state.key()
+				now = time.perf_counter() if timed else 0.0
 				action = self.choose_action(state)
 				q_action = None
 				match action:
 					case Action.ROLL:
-						nr_of_rolls_per_turn += 1
+						now = metrics.lap("choose", now) if timed else now
+						action_id = ROLL_ACTION
 						game.roll()
 						q_action = QAction(action)
 
 					case Action.HOLD:
 						dice_to_hold = self.choose_hold(state)
+						now = metrics.lap("choose", now) if timed else now
+						action_id = encode_action(action, dice_to_hold, state.dice_on_table, state.dice_held)
 						for die in dice_to_hold:
 							game.hold(state.dice_on_table.index(die))
 						q_action = QAction(action, action_value=tuple(dice_to_hold))
 
 					case Action.RELEASE:
 						dice_to_release = self.choose_release(state)
+						now = metrics.lap("choose", now) if timed else now
+						action_id = encode_action(action, dice_to_release, state.dice_on_table, state.dice_held)
 						for die in dice_to_release:
 							game.release(state.dice_held.index(die))
 						q_action = QAction(action, action_value=tuple(state.dice_held))
 
 					case Action.SCORE:
 						category = self.choose_category(state)
+						now = metrics.lap("choose", now) if timed else now
+						action_id = encode_action(action, category, state.dice_on_table, state.dice_held)
 						q_action = QAction(action, action_value=category)
 						game.score(category)
 
+				now = metrics.lap("step", now) if timed else now
 				reward += self.evaluate_reward(state, q_action, available_categories)
 				total_reward += reward
 				next_state = game.state
-				self.update_q_value(state, q_action, reward, next_state, writer=writer)
+				now = metrics.lap("reward", now) if timed else now
+				new_q = self.update_q_value(state_id, action_id, reward, next_state.key(),
+											self.legal_actions(next_state))
+				metrics.lap("update", now) if timed else None
+				logger.log(episode, state_id, action_id, reward, new_q) if logger else None
 				state = next_state
-				nr_of_rolls_per_turn = 0
 
 			self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
 
 			if (episode + 1) % 1000 == 0:
 				print(f"Episode {episode + 1}: Total Reward = {total_reward}, Epsilon = {self.epsilon}")
 			rewards_per_episode.append(total_reward)
+			metrics.end_episode(self, episode, max_turns, total_reward, timed) if metrics else None
+			if checkpoint_every and (episode + 1) % checkpoint_every == 0:
+				self.save_checkpoint(checkpoint_path, episode=episode + 1, rewards=rewards_per_episode, dice=dice)
 
+		logger.close() if logger else None
+		metrics.close() if metrics else None
 		print("Training complete!")
+
+	def train_batched(self, num_episodes=100_000, max_turns=12, num_envs=VEC_ENV_SIZE, seed=None, verbose=True,
+					  log_dir=None, log_every=TRAJECTORY_LOG_EVERY, checkpoint_path=CHECKPOINT_FILE,
+					  checkpoint_every=0, resume=False):
+		if resume and os.path.exists(checkpoint_path):
+			progress = self.load_checkpoint(checkpoint_path)
+			env = progress["env"]
+			episode_ids = progress["episode_ids"]
+			rewards_per_episode = progress["rewards"]
+			episode_rewards = progress["episode_rewards"]
+			episodes = progress["episode"]
+			started = progress["started"]
+			active = progress["active"]
+		else:
+			env = VecEnv(num_envs, max_steps=max_turns, seed=seed)
+			episode_ids = np.arange(num_envs)
+			rewards_per_episode = []
+			episode_rewards = np.zeros(num_envs)
+			episodes = 0
+			# Only num_episodes games are started; environments past the quota idle until the rest finish.
+			started = min(num_envs, num_episodes)
+			active = episode_ids < started
+		num_envs = env.num_envs
+		logger = TrajectoryLogger(log_dir, log_every) if log_dir and log_every else None
+
+		while episodes < num_episodes:
+			types = env.action_types()
+			legal = env.legal_masks()
+			state_ids = env.state_ids()
+			rows = self.q_table.rows_for(state_ids)
+			actions = self.q_table.best_actions(rows, legal)
+			explore = (env.rng.random(num_envs) < self.epsilon) | (actions < 0)
+			actions = np.where(explore, env.sample_actions(legal, types), actions)
+
+			rewards, done = env.step(actions)
+			next_rows = self.q_table.rows_for(env.state_ids())
+			best_next_q = np.where(done, 0.0, self.q_table.best_values(next_rows, env.legal_masks()))
+			new_q = self.q_table.update_batch(rows[active], actions[active],
+											  (rewards + self.gamma * best_next_q)[active], self.alpha)
+			logger.log_batch(episode_ids[active], state_ids[active], actions[active], rewards[active],
+							 new_q) if logger else None
+
+			episode_rewards += rewards
+			finished_envs = np.flatnonzero(done & active)
+			finished = len(finished_envs)
+			if finished:
+				rewards_per_episode.extend(episode_rewards[finished_envs].tolist())
+				restarted = finished_envs[:num_episodes - started]
+				active[finished_envs[len(restarted):]] = False
+				episode_ids[restarted] = started + np.arange(len(restarted))
+				started += len(restarted)
+				episode_rewards[done] = 0
+				env.reset(done)
+				self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay ** finished)
+				if verbose and (episodes + finished) // 1000 > episodes // 1000:
+					print(f"Episode {episodes + finished}: Total Reward = {rewards_per_episode[-1]}, "
+						  f"Epsilon = {self.epsilon}")
+				if checkpoint_every and (episodes + finished) // checkpoint_every > episodes // checkpoint_every:
+					# The environments are pickled mid-game with their generator, so a resumed run
+					# replays the same dice.
+					self.save_checkpoint(checkpoint_path, episode=episodes + finished, rewards=rewards_per_episode,
+										 env=env, episode_ids=episode_ids, episode_rewards=episode_rewards,
+										 started=started, active=active)
+				episodes += finished
+
+		logger.close() if logger else None
+		print("Training complete!") if verbose else None
+		return rewards_per_episode
+
+
+# Rewards only depend on these arguments, so every agent in the process shares one cache.
+@lru_cache(maxsize=REWARD_CACHE_SIZE)
+def _evaluate_reward(dice_on_table: tuple[int, ...], dice_held: tuple[int, ...], rolls_left: int, available: int,
+					 action: Action, action_value) -> float:
+	scoring_categories = [category for category in Category if available & 1 << CATEGORY_COLUMNS[category]]
+	dice = dice_on_table + dice_held
+	reward = 0.0
+
+	match action:
+		case Action.ROLL:
+			reward += 0.1 * rolls_left
+		case Action.HOLD:
+			# The state already reflects the hold, so the newly held dice are taken back out first.
+			previously_held = list(dice_held)
+			for die in action_value or ():
+				previously_held.remove(die)
+			reward += QLearningYahtzee.evaluate_hold(previously_held, action_value, rolls_left, scoring_categories)
+		case Action.RELEASE:
+			reward += QLearningYahtzee.evaluate_release(list(dice_held), action_value, rolls_left, scoring_categories)
+		case Action.SCORE:
+			achieved_score = calculate_score(action_value, list(dice))
+			reward += achieved_score * 2
+
+	reward += expected_total(dice, rolls_left, scoring_categories) * 0.5
+
+	if rolls_left == 0 and not dice_held:
+		reward -= 0.5
+
+	high_value = [Category.YAHTZEE, Category.LARGE_STRAIGHT, Category.FOUR_OF_A_KIND]
+	for category in high_value:
+		probability = calculate_probability(category, list(dice_held), rolls_left)
+		reward += probability * 2
+
+	return reward
+
+
 # plot_rewards(rewards_per_episode)
 # self.save_q_table()
 
 
 def plot_rewards(rewards):
+	import matplotlib.pyplot as plt
+
 	plt.figure(figsize=(10, 6))
 	plt.plot(rewards, label='Reward per Episode', color='blue')
 	plt.xlabel('Episode')
@@ -354,3 +440,7 @@ def plot_rewards(rewards):
 	plt.legend()
 	plt.grid(True)
 	plt.show()
+
+
+if __name__ == "__main__":
+	convert_csv_q_table()
@@ -0,0 +1,390 @@
+import os
+import struct
+
+import numpy as np
+
+from constants import *
+from game import ACTION_WEIGHTS, POSSIBLE_ACTIONS
+from scoring import CATEGORY_COLUMNS
+from state import State, Action, Category, pack_counts, unpack_counts
+
+# Action IDs: roll, score one of the 13 categories, or hold/release the dice picked by a bitmask
+# over the sorted dice on the table/in hand.
+ROLL_ACTION = 0
+SCORE_ACTIONS = 1
+HOLD_ACTIONS = SCORE_ACTIONS + len(Category)
+RELEASE_ACTIONS = HOLD_ACTIONS + 32
+N_ACTIONS = RELEASE_ACTIONS + 32
+
+_CATEGORIES = list(Category)
+
+# Binary table file: a 64-byte header followed by the keys, values, visits, best action and best value
+# arrays, sorted by key. Version 1 files hold only the first three arrays, in insertion order.
+Q_TABLE_MAGIC = b"YQTB"
+Q_TABLE_VERSION = 2
+_HEADER = struct.Struct("<4sIQI44x")
+
+
+def _file_layout(size: int) -> list[tuple[type, tuple[int, ...]]]:
+	return [(np.int64, (size,)), (np.float32, (size, N_ACTIONS)), (np.uint32, (size, N_ACTIONS)),
+			(np.int16, (size,)), (np.float32, (size,))]
+
+
+def category_mask(categories: dict[Category, int]) -> int:
+	mask = 0
+	for category, score in categories.items():
+		if score != -1:
+			mask |= 1 << CATEGORY_COLUMNS[category]
+	return mask
+
+
+def encode_parts(dice_on_table, dice_held, rolls_left: int, mask: int) -> int:
+	return pack_counts(dice_on_table) | pack_counts(dice_held) << 18 | rolls_left << 36 | mask << 38
+
+
+def encode_state(state: State) -> int:
+	return state.key()
+
+
+def decode_state(state_id: int) -> tuple[list[int], list[int], int, int]:
+	return (unpack_counts(state_id & 0x3FFFF), unpack_counts((state_id >> 18) & 0x3FFFF),
+			(state_id >> 36) & 3, state_id >> 38)
+
+
+def dice_bitmask(dice: list[int], chosen: list[int] | tuple[int, ...]) -> int:
+	ordered = sorted(dice)
+	bitmask = 0
+	for die in chosen:
+		for position, value in enumerate(ordered):
+			if value == die and not bitmask & 1 << position:
+				bitmask |= 1 << position
+				break
+	return bitmask
+
+
+def bitmask_dice(dice: list[int], bitmask: int) -> list[int]:
+	return [value for position, value in enumerate(sorted(dice)) if bitmask & 1 << position]
+
+
+def encode_action(action: Action, action_value, dice_on_table: list[int], dice_held: list[int]) -> int:
+	match action:
+		case Action.HOLD:
+			return HOLD_ACTIONS + dice_bitmask(dice_on_table, action_value or ())
+		case Action.RELEASE:
+			return RELEASE_ACTIONS + dice_bitmask(dice_held, action_value or ())
+		case Action.SCORE:
+			return SCORE_ACTIONS + CATEGORY_COLUMNS[action_value]
+	return ROLL_ACTION
+
+
+def decode_action(action_id: int, dice_on_table: list[int], dice_held: list[int]):
+	if action_id >= RELEASE_ACTIONS:
+		return Action.RELEASE, tuple(bitmask_dice(dice_held, action_id - RELEASE_ACTIONS))
+	if action_id >= HOLD_ACTIONS:
+		return Action.HOLD, tuple(bitmask_dice(dice_on_table, action_id - HOLD_ACTIONS))
+	if action_id >= SCORE_ACTIONS:
+		return Action.SCORE, _CATEGORIES[action_id - SCORE_ACTIONS]
+	return Action.ROLL, None
+
+
+def legal_action_mask(actions: list[Action], n_on_table: int, n_held: int, mask: int) -> np.ndarray:
+	legal = np.zeros(N_ACTIONS, dtype=bool)
+	if Action.ROLL in actions:
+		legal[ROLL_ACTION] = True
+	if Action.SCORE in actions:
+		for column in range(len(Category)):
+			legal[SCORE_ACTIONS + column] = not mask & 1 << column
+	if Action.HOLD in actions:
+		legal[HOLD_ACTIONS + 1:HOLD_ACTIONS + (1 << n_on_table)] = True
+	if Action.RELEASE in actions:
+		legal[RELEASE_ACTIONS + 1:RELEASE_ACTIONS + (1 << n_held)] = True
+	return legal
+
+
+def _action_types() -> np.ndarray:
+	types = np.zeros((4, len(Action), 2, 2, len(Action)), dtype=bool)
+	for (rolls_left, previous_action, on_table, held), actions in POSSIBLE_ACTIONS.items():
+		types[rolls_left, previous_action.value, int(on_table), int(held), [action.value for action in set(actions)]] = True
+	return types
+
+
+def _legal_masks() -> np.ndarray:
+	masks = np.zeros((4, len(Action), 6, 6, N_ACTIONS), dtype=bool)
+	for rolls_left, previous_action, n_on_table, n_held in np.ndindex(*masks.shape[:4]):
+		actions = POSSIBLE_ACTIONS[rolls_left, Action(previous_action), n_on_table > 0, n_held > 0]
+		masks[rolls_left, previous_action, n_on_table, n_held] = legal_action_mask(actions, n_on_table, n_held, 0)
+	return masks
+
+
+# Legal action types indexed by [rolls left, previous action, dice on table?, dice held?] and legal
+# action IDs before the category mask indexed by [rolls left, previous action, dice on table, dice held].
+ACTION_TYPES = _action_types()
+ACTION_TYPE_WEIGHTS = np.array([ACTION_WEIGHTS[action] for action in Action])
+LEGAL_MASKS = _legal_masks()
+OPEN_CATEGORIES = ((np.arange(1 << len(Category))[:, None] >> np.arange(len(Category))) & 1) == 0
+
+
+def legal_mask(rolls_left: int, previous_action: Action, n_on_table: int, n_held: int, mask: int) -> np.ndarray:
+	legal = LEGAL_MASKS[rolls_left, previous_action.value, n_on_table, n_held].copy()
+	legal[SCORE_ACTIONS:HOLD_ACTIONS] &= OPEN_CATEGORIES[mask]
+	return legal
+
+
+class QTable:
+	"""
+	Q-values for every visited state, one row of N_ACTIONS per state ID.
+
+	Each row also caches its best visited action and value. Lookups with a legal mask answer from
+	the cache whenever the cached action is legal and only scan the row otherwise.
+
+	A loaded table finds its saved rows by binary search over the sorted keys in the file; only rows
+	added afterwards go into the `rows` dict.
+	"""
+
+	def __init__(self, capacity: int = Q_TABLE_CAPACITY):
+		self.rows: dict[int, int] = {}
+		self.sorted_keys = np.zeros(0, dtype=np.int64)
+		self.base_size = 0
+		self.keys = np.zeros(capacity, dtype=np.int64)
+		self.values = np.zeros((capacity, N_ACTIONS), dtype=np.float32)
+		self.visits = np.zeros((capacity, N_ACTIONS), dtype=np.uint32)
+		self.best = np.full(capacity, -1, dtype=np.int16)
+		self.best_q = np.full(capacity, -np.inf, dtype=np.float32)
+
+	@staticmethod
+	def from_arrays(keys: np.ndarray, values: np.ndarray, visits: np.ndarray) -> "QTable":
+		table = QTable(max(len(keys), 1))
+		table.keys[:len(keys)] = keys
+		table.values[:len(keys)] = values
+		table.visits[:len(keys)] = visits
+		table.rows = {int(key): row for row, key in enumerate(keys.tolist())}
+		table._refresh(np.arange(len(keys)))
+		return table
+
+	def arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+		size = len(self)
+		return self.keys[:size], self.values[:size], self.visits[:size]
+
+	def save(self, path: str = Q_TABLE_FILE):
+		size = len(self)
+		order = np.argsort(self.keys[:size], kind="stable")
+		temporary_path = f"{path}.tmp"
+		with open(temporary_path, "wb") as file:
+			file.write(_HEADER.pack(Q_TABLE_MAGIC, Q_TABLE_VERSION, size, N_ACTIONS))
+			for array, (dtype, _) in zip((self.keys, self.values, self.visits, self.best, self.best_q),
+										 _file_layout(size)):
+				np.ascontiguousarray(array[:size][order], dtype=dtype).tofile(file)
+		os.replace(temporary_path, path)
+
+	@staticmethod
+	def load(path: str = Q_TABLE_FILE, mmap_mode: str = "c") -> "QTable":
+		"""
+		Maps a saved table into memory. With mmap_mode "r" several processes share one read-only
+		copy of the policy; the default "c" keeps writes private to this process.
+		"""
+		with open(path, "rb") as file:
+			magic, version, size, n_actions = _HEADER.unpack(file.read(_HEADER.size))
+		if magic != Q_TABLE_MAGIC or version not in (1, Q_TABLE_VERSION) or n_actions != N_ACTIONS:
+			raise ValueError(f"{path} is not a version {Q_TABLE_VERSION} Q-table file")
+
+		table = QTable(1)
+		if size:
+			arrays = []
+			offset = _HEADER.size
+			for dtype, shape in _file_layout(size)[:3 if version == 1 else None]:
+				arrays.append(np.memmap(path, dtype, mmap_mode, offset, shape))
+				offset += arrays[-1].nbytes
+			if version == 1:
+				return QTable.from_arrays(*arrays)
+			table.keys, table.values, table.visits, table.best, table.best_q = arrays
+			table.sorted_keys = table.keys
+			table.base_size = size
+		return table
+
+	def __len__(self):
+		return self.base_size + len(self.rows)
+
+	@property
+	def nbytes(self) -> int:
+		return self.keys.nbytes + self.values.nbytes + self.visits.nbytes + self.best.nbytes + self.best_q.nbytes
+
+	def find(self, state_id: int) -> int | None:
+		row = self.rows.get(state_id)
+		if row is None and self.base_size:
+			index = int(np.searchsorted(self.sorted_keys, state_id))
+			if index < self.base_size and self.sorted_keys[index] == state_id:
+				return index
+		return row
+
+	def find_rows(self, state_ids: np.ndarray) -> np.ndarray:
+		# Rows of known states and -1 for the rest, without adding rows.
+		rows = np.fromiter((self.rows.get(state_id, -1) for state_id in state_ids.tolist()), dtype=np.int64,
+						   count=len(state_ids))
+		if self.base_size:
+			index = np.searchsorted(self.sorted_keys, state_ids).clip(max=self.base_size - 1)
+			rows = np.where(self.sorted_keys[index] == state_ids, index, rows)
+		return rows
+
+	def row(self, state_id: int) -> int:
+		row = self.find(state_id)
+		if row is None:
+			row = len(self)
+			if row == len(self.keys):
+				self._grow()
+			self.rows[state_id] = row
+			self.keys[row] = state_id
+		return row
+
+	def _grow(self):
+		capacity = 2 * len(self.keys)
+		self.keys = np.resize(self.keys, capacity)
+		self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+		self.visits = np.concatenate([self.visits, np.zeros_like(self.visits)])
+		self.best = np.concatenate([self.best, np.full_like(self.best, -1)])
+		self.best_q = np.concatenate([self.best_q, np.full_like(self.best_q, -np.inf)])
+
+	def _refresh(self, rows: np.ndarray):
+		# Ties go to the lowest action ID, like an argmax over the whole row.
+		masked = np.where(self.visits[rows] > 0, self.values[rows], -np.inf)
+		best = masked.argmax(axis=1)
+		best_q = masked[np.arange(len(rows)), best]
+		self.best[rows] = np.where(np.isneginf(best_q), -1, best)
+		self.best_q[rows] = best_q
+
+	def get(self, state_id: int, action_id: int) -> float:
+		row = self.find(state_id)
+		return 0.0 if row is None else float(self.values[row, action_id])
+
+	def set(self, state_id: int, action_id: int, value: float):
+		row = self.row(state_id)
+		self.values[row, action_id] = value
+		self.visits[row, action_id] += 1
+		value = self.values[row, action_id]
+		best = self.best[row]
+		if value > self.best_q[row] or (value == self.best_q[row] and action_id < best):
+			self.best[row] = action_id
+			self.best_q[row] = value
+		elif action_id == best:
+			self._refresh(np.array([row]))
+
+	def best_action(self, state_id: int, legal: np.ndarray) -> int | None:
+		row = self.find(state_id)
+		if row is None:
+			return None
+		best = int(self.best[row])
+		if best < 0 or legal[best]:
+			return None if best < 0 else best
+		known = legal & (self.visits[row] > 0)
+		if not known.any():
+			return None
+		return int(np.where(known, self.values[row], -np.inf).argmax())
+
+	def best_value(self, state_id: int, legal: np.ndarray) -> float:
+		row = self.find(state_id)
+		if row is None:
+			return 0.0
+		best = int(self.best[row])
+		if best < 0 or legal[best]:
+			return 0.0 if best < 0 else float(self.best_q[row])
+		known = legal & (self.visits[row] > 0)
+		return float(self.values[row][known].max()) if known.any() else 0.0
+
+	def rows_for(self, state_ids: np.ndarray) -> np.ndarray:
+		if not self.base_size:
+			return np.fromiter((self.row(state_id) for state_id in state_ids.tolist()), dtype=np.int64,
+							   count=len(state_ids))
+		rows = self.find_rows(state_ids)
+		for index in np.flatnonzero(rows < 0).tolist():
+			rows[index] = self.row(int(state_ids[index]))
+		return rows
+
+	def _cached(self, rows: np.ndarray, legal: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		# Rows whose cached best action is legal, and the rows that still need a masked scan.
+		best = self.best[rows].astype(np.int64)
+		hit = (best < 0) | legal[np.arange(len(rows)), np.maximum(best, 0)]
+		return best, np.flatnonzero(~hit)
+
+	def best_actions(self, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+		best, missed = self._cached(rows, legal)
+		if len(missed):
+			known = legal[missed] & (self.visits[rows[missed]] > 0)
+			scanned = np.where(known, self.values[rows[missed]], -np.inf).argmax(axis=1)
+			best[missed] = np.where(known.any(axis=1), scanned, -1)
+		return best
+
+	def best_values(self, rows: np.ndarray, legal: np.ndarray) -> np.ndarray:
+		best, missed = self._cached(rows, legal)
+		values = self.best_q[rows].astype(np.float64)
+		if len(missed):
+			known = legal[missed] & (self.visits[rows[missed]] > 0)
+			values[missed] = np.where(known, self.values[rows[missed]], -np.inf).max(axis=1, initial=-np.inf)
+		return values.clip(min=0.0)
+
+	def update_batch(self, rows: np.ndarray, actions: np.ndarray, targets: np.ndarray, alpha: float) -> np.ndarray:
+		# A (row, action) pair that appears k times moves by (1 - (1 - alpha)^k) towards the mean of its
+		# k targets, which were all bootstrapped from the table as it was before this batch.
+		pairs, inverse, counts = np.unique(rows * N_ACTIONS + actions, return_inverse=True, return_counts=True)
+		rows, actions = pairs // N_ACTIONS, pairs % N_ACTIONS
+		mean_targets = np.bincount(inverse, weights=targets, minlength=len(pairs)) / counts
+		keep = (1 - alpha) ** counts
+		self.values[rows, actions] = keep * self.values[rows, actions] + (1 - keep) * mean_targets
+		self.visits[rows, actions] += counts.astype(self.visits.dtype)
+
+		written = self.values[rows, actions]
+		best = self.best[rows]
+		best_q = self.best_q[rows]
+		improved = (written > best_q) | ((written == best_q) & (actions < best))
+		unique_rows, row_counts = np.unique(rows, return_counts=True)
+		repeated = np.isin(rows, unique_rows[row_counts > 1])
+		refresh = repeated | (~improved & (actions == best))
+		direct = improved & ~repeated
+		self.best[rows[direct]] = actions[direct]
+		self.best_q[rows[direct]] = written[direct]
+		if refresh.any():
+			self._refresh(np.unique(rows[refresh]))
+		return written[inverse]
+
+	def items(self):
+		for row, state_id in enumerate(self.keys[:len(self)].tolist()):
+			for action_id in np.flatnonzero(self.visits[row]):
+				yield state_id, int(action_id), float(self.values[row, action_id])
+
+
+def table_changes(table: QTable, base: QTable) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+	"""
+	State keys, action IDs, values and added visits of every entry `table` visited since it was loaded
+	from the same file as `base`, so its first len(base) rows are the rows of `base`.
+	"""
+	size = len(base)
+	changed = np.flatnonzero((table.visits[:size] != base.visits).any(axis=1))
+	rows = np.concatenate([changed, np.arange(size, len(table))])
+	added = np.array(table.visits[rows])
+	added[:len(changed)] -= base.visits[changed]
+	entries, actions = np.nonzero(added)
+	return table.keys[rows[entries]], actions, table.values[rows[entries], actions], added[entries, actions]
+
+
+def merge_tables(base: QTable, changes: list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+				 weighting: str = "visits") -> QTable:
+	"""
+	Merges the (keys, actions, values, added visits) entries that several tables changed into `base`
+	in place.
+
+	With "visits" weighting every value is averaged by the visits each table added, with "mean"
+	weighting the tables that visited an entry count equally.
+	"""
+	keys, actions, values, added = (np.concatenate(column) for column in zip(*changes))
+	if not len(keys):
+		return base
+	weights = added.astype(np.float64) if weighting == "visits" else np.ones(len(added))
+
+	merged_keys, key_groups = np.unique(keys, return_inverse=True)
+	entries, groups = np.unique(key_groups * N_ACTIONS + actions, return_inverse=True)
+	weighted = np.bincount(groups, weights * values, len(entries))
+	total_weights = np.bincount(groups, weights, len(entries))
+	rows = base.rows_for(merged_keys)
+	entry_rows, entry_actions = rows[entries // N_ACTIONS], entries % N_ACTIONS
+	base.values[entry_rows, entry_actions] = weighted / total_weights
+	base.visits[entry_rows, entry_actions] += np.bincount(groups, added, len(entries)).astype(base.visits.dtype)
+	base._refresh(rows)
+	return base
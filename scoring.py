@@ -0,0 +1,96 @@
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+from state import Category
+
+FACES = (1, 2, 3, 4, 5, 6)
+CATEGORY_COLUMNS = {category: category.value - 1 for category in Category}
+
+# Every sorted hand of exactly five dice, and every sorted sub-hand of zero to five dice.
+MULTISETS: list[tuple[int, ...]] = list(combinations_with_replacement(FACES, 5))
+MULTISET_INDEX: dict[tuple[int, ...], int] = {dice: index for index, dice in enumerate(MULTISETS)}
+KEEPS: list[tuple[int, ...]] = [dice for size in range(6) for dice in combinations_with_replacement(FACES, size)]
+KEEP_INDEX: dict[tuple[int, ...], int] = {dice: index for index, dice in enumerate(KEEPS)}
+
+
+def score_dice(category: Category, dice: list | tuple) -> int:
+	match category:
+		case Category.ONES:
+			return dice.count(1)
+		case Category.TWOS:
+			return dice.count(2) * 2
+		case Category.THREES:
+			return dice.count(3) * 3
+		case Category.FOURS:
+			return dice.count(4) * 4
+		case Category.FIVES:
+			return dice.count(5) * 5
+		case Category.SIXES:
+			return dice.count(6) * 6
+		case Category.THREE_OF_A_KIND:
+			return sum(dice) if any(dice.count(x) >= 3 for x in set(dice)) else 0
+		case Category.FOUR_OF_A_KIND:
+			return sum(dice) if any(dice.count(x) >= 4 for x in set(dice)) else 0
+		case Category.FULL_HOUSE:
+			return 25 if sorted([dice.count(x) for x in set(dice)]) == [2, 3] else 0
+		case Category.SMALL_STRAIGHT:
+			if {1, 2, 3, 4}.issubset(dice) or {2, 3, 4, 5}.issubset(dice) or {3, 4, 5, 6}.issubset(dice):
+				return 30
+			return 0
+		case Category.LARGE_STRAIGHT:
+			if set(dice) == {1, 2, 3, 4, 5} or set(dice) == {2, 3, 4, 5, 6}:
+				return 40
+			return 0
+		case Category.YAHTZEE:
+			return 50 if len(set(dice)) == 1 else 0
+		case Category.CHANCE:
+			return sum(dice)
+	return 0
+
+
+_SCORE_ROWS: dict[tuple[int, ...], tuple[int, ...]] = {
+	dice: tuple(score_dice(category, dice) for category in Category) for dice in KEEPS
+}
+
+SCORE_TABLE = np.array([_SCORE_ROWS[dice] for dice in MULTISETS], dtype=np.int16)
+KEEP_SCORE_TABLE = np.array([_SCORE_ROWS[dice] for dice in KEEPS], dtype=np.int16)
+
+
+def calculate_score(category: Category, dice: list | tuple) -> int:
+	if category not in CATEGORY_COLUMNS:
+		return 0
+	row = _SCORE_ROWS.get(tuple(sorted(dice)))
+	return row[CATEGORY_COLUMNS[category]] if row else score_dice(category, list(dice))
+
+
+def score_row(dice: list | tuple) -> tuple[int, ...]:
+	row = _SCORE_ROWS.get(tuple(sorted(dice)))
+	return row if row else tuple(score_dice(category, list(dice)) for category in Category)
+
+
+_COUNT_RADIX = 6 ** np.arange(6)
+
+# Maps the base-6 encoding of a face histogram to the index of that hand in KEEPS.
+_COUNT_CODE_TO_KEEP = np.full(6 ** 6, -1, dtype=np.int16)
+for _index, _dice in enumerate(KEEPS):
+	_COUNT_CODE_TO_KEEP[sum(_dice.count(face) * 6 ** (face - 1) for face in FACES)] = _index
+
+
+def face_counts(dice: np.ndarray) -> np.ndarray:
+	dice = np.asarray(dice)
+	rows = dice.shape[0]
+	offsets = (dice - 1) + 6 * np.arange(rows)[:, None]
+	return np.bincount(offsets.ravel(), minlength=6 * rows).reshape(rows, 6)
+
+
+def keep_ids(counts: np.ndarray) -> np.ndarray:
+	return _COUNT_CODE_TO_KEEP[np.asarray(counts) @ _COUNT_RADIX]
+
+
+def score_counts(counts: np.ndarray) -> np.ndarray:
+	return KEEP_SCORE_TABLE[keep_ids(counts)]
+
+
+def score_batch(dice: np.ndarray) -> np.ndarray:
+	return score_counts(face_counts(dice))
@@ -1,4 +1,6 @@
 from enum import Enum
+from itertools import combinations_with_replacement
+from types import MappingProxyType
 
 
 class StateType(Enum):
@@ -59,17 +61,121 @@ categories = {
 }
 
 empty_category_dict = {cat: -1 for cat in Category}
+CATEGORY_INDEX = {category: index for index, category in enumerate(Category)}
+_CATEGORY_BITS = {category: 1 << index for index, category in enumerate(Category)}
+_CATEGORY_BIT_PAIRS = tuple(_CATEGORY_BITS.items())
+ALL_CATEGORIES_USED = (1 << len(Category)) - 1
+
+
+def pack_counts(dice: list[int] | tuple[int, ...]) -> int:
+	packed = 0
+	for die in dice:
+		packed += 1 << 3 * (die - 1)
+	return packed
+
+
+def _unpack_counts(packed: int) -> tuple[int, ...]:
+	return tuple(face for face in range(1, 7) for _ in range((packed >> 3 * (face - 1)) & 7))
+
+
+# Every hand of zero to five dice, keyed by its packed counts.
+_HANDS = {pack_counts(hand): hand for size in range(6) for hand in combinations_with_replacement(range(1, 7), size)}
+
+
+def unpack_counts(packed: int) -> list[int]:
+	hand = _HANDS.get(packed)
+	return list(hand if hand is not None else _unpack_counts(packed))
+
+
+START_TABLE = pack_counts([1, 2, 3, 4, 5])
+_EMPTY_SHEET = (-1,) * len(Category)
 
 
 class State:
+	"""
+	Game state with the dice packed as face counts (3 bits per face) and a used-category bitmask per
+	player. dice_on_table, dice_held, categories and score are views computed from the packed fields:
+	dice are returned sorted, and the dice setters are the only way to replace them.
+	"""
+
+	__slots__ = ("state_type", "turn", "rolls_left", "table", "held", "used", "sheets", "totals")
+
 	def __init__(self, dice_held: list[int] = None, dice_on_table: list[int] = None, rolls_left: int = None):
 		self.state_type: StateType = StateType.INITIAL
 		self.turn: int = 0
-		self.score: dict[int, int] = {0: 0, 1: 0}
 		self.rolls_left: int = 3 if rolls_left is None else rolls_left
-		self.dice_held: list[int] = dice_held if dice_held else []
-		self.dice_on_table: list[int] = dice_on_table if dice_on_table else [1, 2, 3, 4, 5]
-		self.categories: list[dict[Category, int]] = [empty_category_dict.copy(), empty_category_dict.copy()]
+		self.held: int = pack_counts(dice_held) if dice_held else 0
+		self.table: int = pack_counts(dice_on_table) if dice_on_table else START_TABLE
+		self.used: tuple[int, int] = (0, 0)
+		self.sheets: tuple[tuple[int, ...], ...] = (_EMPTY_SHEET, _EMPTY_SHEET)
+		self.totals: tuple[int, int] = (0, 0)
+
+	def copy(self) -> "State":
+		state = State.__new__(State)
+		state.state_type = self.state_type
+		state.turn = self.turn
+		state.rolls_left = self.rolls_left
+		state.table = self.table
+		state.held = self.held
+		state.used = self.used
+		state.sheets = self.sheets
+		state.totals = self.totals
+		return state
+
+	def __deepcopy__(self, memo) -> "State":
+		return self.copy()
+
+	def key(self) -> int:
+		return self.table | self.held << 18 | self.rolls_left << 36 | self.used[self.turn] << 38
+
+	@property
+	def dice_on_table(self) -> list[int]:
+		return unpack_counts(self.table)
+
+	@dice_on_table.setter
+	def dice_on_table(self, dice: list[int]):
+		self.table = pack_counts(dice)
+
+	@property
+	def dice_held(self) -> list[int]:
+		return unpack_counts(self.held)
+
+	@dice_held.setter
+	def dice_held(self, dice: list[int]):
+		self.held = pack_counts(dice)
+
+	@property
+	def categories(self) -> list[MappingProxyType]:
+		return [MappingProxyType(dict(zip(Category, sheet))) for sheet in self.sheets]
+
+	@property
+	def score(self) -> tuple[int, int]:
+		return self.totals
+
+	def available_categories(self) -> list[Category]:
+		used = self.used[self.turn]
+		return [category for category, bit in _CATEGORY_BIT_PAIRS if not used & bit]
+
+	def hold(self, die: int):
+		self.table -= 1 << 3 * (die - 1)
+		self.held += 1 << 3 * (die - 1)
+
+	def release(self, die: int):
+		self.held -= 1 << 3 * (die - 1)
+		self.table += 1 << 3 * (die - 1)
+
+	def set_score(self, category: Category, points: int):
+		sheet = list(self.sheets[self.turn])
+		sheet[CATEGORY_INDEX[category]] = points
+		sheets = list(self.sheets)
+		sheets[self.turn] = tuple(sheet)
+		self.sheets = tuple(sheets)
+		used = list(self.used)
+		used[self.turn] |= _CATEGORY_BITS[category]
+		self.used = tuple(used)
+		totals = list(self.totals)
+		totals[self.turn] += points
+		self.totals = tuple(totals)
 
 	def __str__(self):
-		return f"State(turn={self.turn}, score={self.score}, rolls_left={self.rolls_left}, dice_held={self.dice_held}, dice_on_table={self.dice_on_table}, categories={self.categories})"
+		return f"State(turn={self.turn}, score={self.score}, rolls_left={self.rolls_left}, dice_held={self.dice_held}, dice_on_table={self.dice_on_table}, categories={[dict(sheet) for sheet in self.categories]})"
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from ai_executor import AIDecisionExecutor
+from clock import VirtualClock
+from game import RandomYahtzeeAI
+from state import Action, State
+from ui_dispatcher import UIDispatcher
+
+
+def wait_for_post(dispatcher: UIDispatcher, timeout: float = 5.0):
+	deadline = time.monotonic() + timeout
+	while dispatcher.queue.empty():
+		assert time.monotonic() < deadline, "the worker never posted its result"
+		time.sleep(0.001)
+
+
+def request_decision(executor: AIDecisionExecutor, ai: RandomYahtzeeAI, state: State, decided: list,
+					 release: threading.Event | None = None):
+	# Wired like YahtzeeApp.request_ai_decision: the decision runs on a fork that is only adopted
+	# when its result is used.
+	fork = ai.fork()
+
+	def decide(state):
+		if release is not None:
+			release.wait()
+		return fork.choose_action(state), fork
+
+	def on_decided(decision):
+		result, decided_by = decision
+		if decided_by is not None:
+			ai.adopt(decided_by)
+		decided.append(result)
+
+	return executor.submit(decide, state, on_done=on_decided, fallback=lambda: (Action.SCORE, None))
+
+
+def test_over_budget_decision_falls_back_and_late_result_is_discarded():
+	clock = VirtualClock()
+	dispatcher = UIDispatcher(clock)
+	executor = AIDecisionExecutor(dispatcher, clock, budget=100)
+	ai = RandomYahtzeeAI(seed=3)
+	rng_state = ai.rng.getstate()
+	state = State(dice_on_table=[1, 2, 3, 4, 5], rolls_left=2)
+	decided = []
+	release = threading.Event()
+	try:
+		late = request_decision(executor, ai, state, decided, release)
+		clock.advance(executor.budget)
+		assert decided == [Action.SCORE]
+		assert executor.timeouts == 1
+
+		release.set()
+		late.result(timeout=5)
+		wait_for_post(dispatcher)
+		clock.advance(dispatcher.interval)
+		assert decided == [Action.SCORE]
+		assert ai.rng.getstate() == rng_state
+		assert ai.previous_action == Action.ROLL
+
+		request_decision(executor, ai, state, decided)
+		wait_for_post(dispatcher)
+		clock.advance(dispatcher.interval)
+		assert len(decided) == 2
+		assert ai.previous_action == decided[1]
+		assert ai.rng.getstate() != rng_state
+		assert executor.timeouts == 1 and executor.failures == 0
+	finally:
+		release.set()
+		executor.shutdown()
+		dispatcher.close()
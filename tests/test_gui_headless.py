@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+tk = pytest.importorskip("tkinter")
+ctk = pytest.importorskip("customtkinter")
+
+from clock import VirtualClock
+from constants import UI_QUEUE_INTERVAL
+from dice import DiceSource
+from game import Yahtzee, RandomYahtzeeAI
+from gui import YahtzeeApp
+from state import StateType, ALL_CATEGORIES_USED
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def advance_until(clock: VirtualClock, done, limit: int = 100_000):
+	for _ in range(limit):
+		if done():
+			return
+		clock.advance(UI_QUEUE_INTERVAL)
+	raise AssertionError("the GUI stopped making progress")
+
+
+def play_scripted_game(seed: int) -> tuple[int, int]:
+	try:
+		root = ctk.CTk()
+	except tk.TclError as error:
+		pytest.skip(f"Tk needs a display: {error}")
+	try:
+		clock = VirtualClock()
+		game = Yahtzee(RandomYahtzeeAI(seed), DiceSource(seed))
+		app = YahtzeeApp(root, game, clock=clock, animation="off")
+
+		def finished() -> bool:
+			return game.state.used == (ALL_CATEGORIES_USED, ALL_CATEGORIES_USED)
+
+		while not finished():
+			assert game.state.turn == 0
+			app.start_roll_animation()
+			app.toggle_dice_hold(0)
+			app.start_roll_animation()
+			app.on_score_push(game.get_available_categories()[0])
+			advance_until(clock, lambda: finished() or (
+					game.state.turn == 0 and game.state.state_type == StateType.INITIAL))
+
+		assert game.is_game_finished()
+		assert game.state.score == tuple(sum(sheet) for sheet in game.state.sheets)
+		assert [app.total_score_labels[player].cget("text") for player in (0, 1)] == [str(score) for score in
+																					  game.state.score]
+		assert app.ai_executor.timeouts == 0 and app.ai_executor.failures == 0
+		return game.state.score
+	finally:
+		root.destroy()
+
+
+def test_scripted_game_with_animation_off(monkeypatch):
+	monkeypatch.chdir(REPOSITORY)
+	scores = play_scripted_game(seed=7)
+	assert play_scripted_game(seed=7) == scores
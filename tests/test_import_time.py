@@ -0,0 +1,12 @@
+import pytest
+
+from benchmark import import_time
+from constants import IMPORT_TIME_BUDGETS
+
+
+@pytest.mark.parametrize("module", IMPORT_TIME_BUDGETS)
+def test_import_time_within_budget(module: str):
+	# Best of three fresh interpreters, like the benchmark runs, so one slow start does not fail the test.
+	milliseconds = min(import_time(module) for _ in range(3)) * 1000
+	assert milliseconds <= IMPORT_TIME_BUDGETS[module], \
+		f"importing {module} took {milliseconds:.0f}ms, over its {IMPORT_TIME_BUDGETS[module]}ms budget"
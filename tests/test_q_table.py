@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from q_table import N_ACTIONS, QTable, merge_tables, table_changes
+
+
+@pytest.fixture
+def base_path(tmp_path):
+	keys = np.array([10, 20, 30])
+	values = np.zeros((3, N_ACTIONS), dtype=np.float32)
+	visits = np.zeros((3, N_ACTIONS), dtype=np.uint32)
+	values[0, 1], visits[0, 1] = 4.0, 2
+	values[1, 2], visits[1, 2] = 8.0, 1
+	path = str(tmp_path / "q_table.bin")
+	QTable.from_arrays(keys, values, visits).save(path)
+	return path
+
+
+def shard_changes(path: str, updates: list[tuple[int, int, float, int]]):
+	table = QTable.load(path)
+	for state_id, action_id, value, visits in updates:
+		for _ in range(visits):
+			table.set(state_id, action_id, value)
+	return table_changes(table, QTable.load(path, "r"))
+
+
+@pytest.mark.parametrize("weighting, expected", [("visits", (1 * 1.0 + 3 * 5.0) / 4), ("mean", (1.0 + 5.0) / 2)])
+def test_merge_weights_values_of_shared_entries(base_path, weighting, expected):
+	changes = [shard_changes(base_path, [(10, 1, 1.0, 1), (40, 3, 2.0, 2)]),
+			   shard_changes(base_path, [(10, 1, 5.0, 3), (20, 0, 9.0, 1)])]
+	merged = merge_tables(QTable.load(base_path), changes, weighting)
+	row = merged.find(10)
+	assert merged.values[row, 1] == pytest.approx(expected)
+	assert merged.visits[row, 1] == 2 + 1 + 3
+	assert merged.get(20, 0) == 9.0 and merged.get(20, 2) == 8.0
+	assert merged.get(40, 3) == 2.0 and merged.visits[merged.find(40), 3] == 2
+	assert len(merged) == 4
+
+
+def test_merge_refreshes_best_actions(base_path):
+	changes = [shard_changes(base_path, [(10, 5, 7.0, 1)]), shard_changes(base_path, [(30, 4, -1.0, 1)])]
+	merged = merge_tables(QTable.load(base_path), changes)
+	rows = merged.find_rows(np.array([10, 20, 30]))
+	assert merged.best[rows].tolist() == [5, 2, 4]
+	assert merged.best_q[rows].tolist() == [7.0, 8.0, -1.0]
+
+
+def test_unchanged_table_has_no_changes(base_path):
+	keys, actions, values, added = shard_changes(base_path, [])
+	assert len(keys) == len(actions) == len(values) == len(added) == 0
+	assert len(merge_tables(QTable.load(base_path), [(keys, actions, values, added)])) == 3
@@ -0,0 +1,24 @@
+from clock import VirtualClock
+from ui_dispatcher import UIDispatcher
+
+
+def test_failing_callable_does_not_stop_the_drain():
+	clock = VirtualClock()
+	dispatcher = UIDispatcher(clock)
+	delivered = []
+	dispatcher.post(lambda: 1 / 0)
+	dispatcher.post(delivered.append, 1)
+	clock.advance(dispatcher.interval)
+	dispatcher.post(delivered.append, 2)
+	clock.advance(dispatcher.interval)
+	assert delivered == [1, 2]
+	assert dispatcher.failures == 1
+
+
+def test_close_stops_the_drain_rescheduling():
+	clock = VirtualClock()
+	dispatcher = UIDispatcher(clock)
+	clock.advance(dispatcher.interval)
+	dispatcher.close()
+	clock.advance(dispatcher.interval)
+	assert not clock.timers
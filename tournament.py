@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from constants import *
+from dice import DiceSource
+from game import Yahtzee, YahtzeeAIBase, RandomYahtzeeAI
+from state import Action, Category
+
+AI_NAMES = ["random", "qlearning", "optimal"]
+SCORE_PERCENTILES = [5, 25, 50, 75, 95]
+LATENCY_PERCENTILES = [50, 90, 99]
+
+
+def make_ai(name: str, seed: int, q_table_path: str = Q_TABLE_FILE) -> YahtzeeAIBase:
+	match name:
+		case "random":
+			return RandomYahtzeeAI(seed)
+		case "qlearning":
+			from q_learning import QLearningYahtzee
+			if not os.path.exists(q_table_path):
+				raise FileNotFoundError(f"No trained Q-table at {q_table_path}")
+			ai = QLearningYahtzee(seed)
+			ai.load_q_table(q_table_path, mmap_mode="r")
+			ai.epsilon = 0.0
+			return ai
+		case "optimal":
+			from optimal import OptimalYahtzeeAI
+			return OptimalYahtzeeAI()
+	raise ValueError(f"Unknown AI {name!r}, expected one of {AI_NAMES}")
+
+
+def _timed(latencies: list[int], function, *args):
+	start = time.perf_counter_ns()
+	result = function(*args)
+	latencies.append(time.perf_counter_ns() - start)
+	return result
+
+
+def play_turn(game: Yahtzee, ai: YahtzeeAIBase, latencies: list[int], max_steps: int = TOURNAMENT_TURN_STEPS):
+	state = game.state
+	available = game.get_available_categories()
+	for _ in range(max_steps):
+		action = _timed(latencies, ai.choose_action, state)
+		match action:
+			case Action.ROLL if state.rolls_left > 0:
+				game.roll()
+			case Action.HOLD:
+				for die in _timed(latencies, ai.choose_hold, state):
+					if die in state.dice_on_table:
+						game.hold(state.dice_on_table.index(die))
+			case Action.RELEASE:
+				for die in _timed(latencies, ai.choose_release, state):
+					if die in state.dice_held:
+						game.release(state.dice_held.index(die))
+			case Action.SCORE:
+				break
+	# A turn that runs out of steps or picks an used category scores the first free one.
+	category = _timed(latencies, ai.choose_category, state)
+	game.score(category if category in available else available[0])
+
+
+def play_game(ais: tuple[YahtzeeAIBase, YahtzeeAIBase], dice: DiceSource,
+			  latencies: tuple[list[int], list[int]]) -> tuple[int, int]:
+	game = Yahtzee(ais[0], dice)
+	for _ in range(2 * len(Category)):
+		player = game.state.turn
+		game.ai = ais[player]
+		play_turn(game, ais[player], latencies[player])
+		game.end_turn()
+	return game.state.score[0], game.state.score[1]
+
+
+def _play_shard(names: tuple[str, str], num_games: int, seed: np.random.SeedSequence, q_table_path: str):
+	dice_seed, *ai_seeds = seed.spawn(3)
+	ais = tuple(make_ai(name, int(ai_seed.generate_state(1)[0]), q_table_path) for name, ai_seed in zip(names, ai_seeds))
+	dice = DiceSource(dice_seed)
+	scores = np.zeros((num_games, 2), dtype=np.int64)
+	latencies = ([], [])
+	for index in range(num_games):
+		# Seats alternate so neither AI always moves first.
+		if index % 2:
+			second, first = play_game(ais[::-1], dice, latencies[::-1])
+		else:
+			first, second = play_game(ais, dice, latencies)
+		scores[index] = first, second
+	return scores, np.array(latencies[0], dtype=np.int64), np.array(latencies[1], dtype=np.int64)
+
+
+def _summary(scores: np.ndarray, latencies: np.ndarray) -> dict:
+	return {
+		"mean": float(scores.mean()),
+		"std": float(scores.std()),
+		"percentiles": dict(zip(map(str, SCORE_PERCENTILES), np.percentile(scores, SCORE_PERCENTILES).tolist())),
+		"decision_latency_us": dict(zip(map(str, LATENCY_PERCENTILES),
+										(np.percentile(latencies, LATENCY_PERCENTILES) / 1000).tolist()))
+		if len(latencies) else {},
+	}
+
+
+def run_tournament(first: str, second: str, num_games: int = 1000, workers: int | None = None,
+				   shard_games: int = TOURNAMENT_SHARD_GAMES, seed: int | None = None,
+				   q_table_path: str = Q_TABLE_FILE) -> dict:
+	"""
+	Plays `num_games` headless two-player games between two AIs across a process pool.
+
+	Games are split into shards of `shard_games`, each with its own dice and AI seed streams, so
+	a seeded tournament gives the same scores whatever the number of workers.
+	"""
+	if "optimal" in (first, second):
+		from optimal import load_or_solve
+		load_or_solve()
+	workers = workers or os.cpu_count() or 1
+	shards = [min(shard_games, num_games - start) for start in range(0, num_games, shard_games)]
+	seeds = np.random.SeedSequence(seed).spawn(len(shards))
+
+	start = time.perf_counter()
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		results = list(executor.map(_play_shard, [(first, second)] * len(shards), shards, seeds,
+									[q_table_path] * len(shards)))
+	elapsed = time.perf_counter() - start
+
+	scores = np.concatenate([result[0] for result in results])
+	first_latencies = np.concatenate([result[1] for result in results])
+	second_latencies = np.concatenate([result[2] for result in results])
+	margins = scores[:, 0] - scores[:, 1]
+	return {
+		"players": [first, second],
+		"games": num_games,
+		"seed": seed,
+		"seconds": elapsed,
+		"games_per_second": num_games / elapsed,
+		"wins": int((margins > 0).sum()),
+		"losses": int((margins < 0).sum()),
+		"ties": int((margins == 0).sum()),
+		"win_rate": float(((margins > 0).sum() + 0.5 * (margins == 0).sum()) / num_games),
+		"results": [_summary(scores[:, 0], first_latencies), _summary(scores[:, 1], second_latencies)],
+	}
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Play headless games between two AIs and report their scores.")
+	parser.add_argument("first", choices=AI_NAMES)
+	parser.add_argument("second", choices=AI_NAMES)
+	parser.add_argument("--games", type=int, default=1000)
+	parser.add_argument("--workers", type=int, default=None)
+	parser.add_argument("--shard-games", type=int, default=TOURNAMENT_SHARD_GAMES)
+	parser.add_argument("--seed", type=int, default=None)
+	parser.add_argument("--q-table", default=Q_TABLE_FILE)
+	parser.add_argument("--output", default=TOURNAMENT_RESULTS_FILE)
+	args = parser.parse_args()
+	if "qlearning" in (args.first, args.second) and not os.path.exists(args.q_table):
+		parser.error(f"no trained Q-table at {args.q_table}, train one first or pass --q-table")
+
+	tournament = run_tournament(args.first, args.second, args.games, args.workers, args.shard_games, args.seed,
+								args.q_table)
+	with open(args.output, "w") as file:
+		json.dump(tournament, file, indent=4)
+	print(f"{args.first} vs {args.second}: win rate {tournament['win_rate']:.3f} over {args.games} games, "
+		  f"{tournament['games_per_second']:.0f} games/s")
+	for player, summary in zip(tournament["players"], tournament["results"]):
+		print(f"{player}: mean {summary['mean']:.1f}, std {summary['std']:.1f}, "
+			  f"median {summary['percentiles']['50']:.0f}")
@@ -0,0 +1,110 @@
+import cProfile
+import json
+import time
+import tracemalloc
+
+import numpy as np
+
+from constants import *
+
+TRAINING_PHASES = ("choose", "step", "reward", "update")
+
+
+class TrainingMetrics:
+	"""
+	Collects throughput, Q-table size, cache hit rates and per-phase timings during training.
+
+	Every `every` episodes a record is passed to `callback` and appended as one line to the JSONL
+	file at `path`. Phase timings are only taken on every `sample_every`th episode, so unsampled
+	episodes pay for a single check. With `profile_episodes` set to (start, stop) those episodes
+	run under cProfile, and with `trace_memory` also under tracemalloc.
+	"""
+
+	def __init__(self, every: int = METRICS_EVERY, path: str | None = None, callback=None,
+				 sample_every: int = METRICS_SAMPLE_EVERY, profile_episodes: tuple[int, int] | None = None,
+				 profile_path: str = METRICS_PROFILE_FILE, trace_memory: bool = False):
+		self.every = every
+		self.path = path
+		self.callback = callback
+		self.sample_every = sample_every
+		self.profile_episodes = profile_episodes
+		self.profile_path = profile_path
+		self.trace_memory = trace_memory
+		self.profiler = None
+		self.file = open(path, "a") if path else None
+		self.records = []
+		self._reset(time.perf_counter())
+
+	def _reset(self, now: float):
+		self.window_start = now
+		self.episodes = 0
+		self.steps = 0
+		self.total_reward = 0.0
+		self.sampled_steps = 0
+		self.phase_seconds = dict.fromkeys(TRAINING_PHASES, 0.0)
+
+	def sampled(self, episode: int) -> bool:
+		return bool(self.sample_every) and episode % self.sample_every == 0
+
+	def lap(self, phase: str, start: float) -> float:
+		now = time.perf_counter()
+		self.phase_seconds[phase] += now - start
+		return now
+
+	def start_episode(self, episode: int):
+		if self.profile_episodes and episode == self.profile_episodes[0]:
+			self.profiler = cProfile.Profile()
+			tracemalloc.start() if self.trace_memory else None
+			self.profiler.enable()
+
+	def end_episode(self, agent, episode: int, steps: int, total_reward: float, sampled: bool):
+		self.episodes += 1
+		self.steps += steps
+		self.total_reward += total_reward
+		self.sampled_steps += steps if sampled else 0
+		if self.profiler and episode + 1 == self.profile_episodes[1]:
+			self._stop_profile()
+		if self.every and (episode + 1) % self.every == 0:
+			self.report(agent, episode + 1)
+
+	def _stop_profile(self):
+		self.profiler.disable()
+		self.profiler.dump_stats(f"{self.profile_path}.prof")
+		self.profiler = None
+		if tracemalloc.is_tracing():
+			snapshot = tracemalloc.take_snapshot()
+			tracemalloc.stop()
+			with open(f"{self.profile_path}_memory.txt", "w") as file:
+				for statistic in snapshot.statistics("lineno")[:METRICS_MEMORY_TOP]:
+					file.write(f"{statistic}\n")
+
+	def report(self, agent, episode: int) -> dict:
+		now = time.perf_counter()
+		elapsed = max(now - self.window_start, 1e-9)
+		q_table = agent.q_table
+		cache = agent.reward_cache_info()
+		lookups = cache.hits + cache.misses
+		record = {
+			"episode": episode,
+			"episodes_per_second": self.episodes / elapsed,
+			"steps_per_second": self.steps / elapsed,
+			"mean_reward": self.total_reward / max(self.episodes, 1),
+			"epsilon": agent.epsilon,
+			"states": len(q_table),
+			"actions": int(np.count_nonzero(q_table.visits[:len(q_table)])),
+			"q_table_bytes": q_table.nbytes,
+			"cache_hit_rates": {"reward": cache.hits / lookups if lookups else 0.0},
+			"phase_seconds_per_step": {phase: seconds / self.sampled_steps if self.sampled_steps else 0.0
+									   for phase, seconds in self.phase_seconds.items()},
+		}
+		self.records.append(record)
+		self.callback(record) if self.callback else None
+		if self.file:
+			self.file.write(json.dumps(record) + "\n")
+			self.file.flush()
+		self._reset(now)
+		return record
+
+	def close(self):
+		self._stop_profile() if self.profiler else None
+		self.file.close() if self.file else None
@@ -0,0 +1,115 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from constants import *
+
+TRAJECTORY_COLUMNS = {
+	"episode": np.int64,
+	"state_id": np.int64,
+	"action_id": np.int16,
+	"reward": np.float32,
+	"q_value": np.float32,
+}
+
+
+class TrajectoryLogger:
+	"""
+	Samples training steps into preallocated column buffers and appends full buffers to one raw
+	file per column from a background thread. With `every` set to N only every Nth step is kept,
+	0 turns logging off.
+	"""
+
+	def __init__(self, directory: str = TRAJECTORY_LOG_DIR, every: int = TRAJECTORY_LOG_EVERY,
+				 buffer_size: int = TRAJECTORY_BUFFER_SIZE, buffers: int = TRAJECTORY_BUFFERS):
+		self.directory = directory
+		self.every = every
+		self.buffer_size = buffer_size
+		self.step = 0
+		self.logged = 0
+		self.buffers = [{name: np.empty(buffer_size, dtype) for name, dtype in TRAJECTORY_COLUMNS.items()}
+						for _ in range(buffers)]
+		self.free_buffers = queue.Queue()
+		self.full_buffers = queue.Queue()
+		for index in range(1, buffers):
+			self.free_buffers.put(index)
+		self.current = 0
+		self.position = 0
+
+		os.makedirs(directory, exist_ok=True)
+		with open(os.path.join(directory, "schema.json"), "w") as file:
+			json.dump({name: np.dtype(dtype).str for name, dtype in TRAJECTORY_COLUMNS.items()}, file)
+		self.files = {name: open(os.path.join(directory, f"{name}.bin"), "ab") for name in TRAJECTORY_COLUMNS}
+		self.writer = threading.Thread(target=self._write_loop, daemon=True)
+		self.writer.start()
+
+	def log(self, episode: int, state_id: int, action_id: int, reward: float, q_value: float):
+		self.step += 1
+		if not self.every or self.step % self.every:
+			return
+		buffer = self.buffers[self.current]
+		position = self.position
+		buffer["episode"][position] = episode
+		buffer["state_id"][position] = state_id
+		buffer["action_id"][position] = action_id
+		buffer["reward"][position] = reward
+		buffer["q_value"][position] = q_value
+		self.position += 1
+		if self.position == self.buffer_size:
+			self._swap()
+
+	def log_batch(self, episode: np.ndarray, state_id: np.ndarray, action_id: np.ndarray, reward: np.ndarray,
+				  q_value: np.ndarray):
+		if not self.every:
+			return
+		first = -(self.step + 1) % self.every
+		self.step += len(state_id)
+		columns = {"episode": episode, "state_id": state_id, "action_id": action_id, "reward": reward,
+				   "q_value": q_value}
+		columns = {name: np.broadcast_to(values, state_id.shape)[first::self.every] for name, values in columns.items()}
+		count = len(columns["state_id"])
+		start = 0
+		while start < count:
+			taken = min(count - start, self.buffer_size - self.position)
+			buffer = self.buffers[self.current]
+			for name, values in columns.items():
+				buffer[name][self.position:self.position + taken] = values[start:start + taken]
+			self.position += taken
+			start += taken
+			if self.position == self.buffer_size:
+				self._swap()
+
+	def _swap(self):
+		self.full_buffers.put((self.current, self.position))
+		self.logged += self.position
+		self.current = self.free_buffers.get()
+		self.position = 0
+
+	def _write_loop(self):
+		while True:
+			item = self.full_buffers.get()
+			if item is None:
+				return
+			index, count = item
+			for name, file in self.files.items():
+				file.write(self.buffers[index][name][:count].tobytes())
+			self.free_buffers.put(index)
+
+	def close(self):
+		if self.position:
+			self.full_buffers.put((self.current, self.position))
+			self.logged += self.position
+			self.position = 0
+		self.full_buffers.put(None)
+		self.writer.join()
+		for file in self.files.values():
+			file.close()
+
+
+def read_trajectories(directory: str = TRAJECTORY_LOG_DIR) -> dict[str, np.ndarray]:
+	with open(os.path.join(directory, "schema.json")) as file:
+		schema = json.load(file)
+	return {name: np.fromfile(os.path.join(directory, f"{name}.bin"), np.dtype(dtype)) for name, dtype in schema.items()}
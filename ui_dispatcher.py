@@ -0,0 +1,48 @@
+import queue
+import time
+import traceback
+
+from constants import *
+
+
+class UIDispatcher:
+	"""
+	Runs callables posted from any thread on the Tk thread.
+
+	Workers call post() and the Tk loop drains the queue every `interval` ms through the clock's after(),
+	spending at most `budget` ms per drain so a burst of updates cannot freeze a frame. A callable
+	that raises is reported and counted in `failures`; the rest of the queue still runs.
+	"""
+
+	def __init__(self, clock, interval: int = UI_QUEUE_INTERVAL, budget: float = UI_FRAME_BUDGET):
+		self.clock = clock
+		self.interval = interval
+		self.budget = budget / 1000
+		self.queue = queue.SimpleQueue()
+		self.running = True
+		self.failures = 0
+		self.clock.after(self.interval, self._drain)
+
+	def post(self, function, *args):
+		self.queue.put((function, args))
+
+	def _drain(self):
+		if not self.running:
+			return
+		deadline = time.perf_counter() + self.budget
+		try:
+			while time.perf_counter() < deadline:
+				try:
+					function, args = self.queue.get_nowait()
+				except queue.Empty:
+					break
+				try:
+					function(*args)
+				except Exception:
+					self.failures += 1
+					traceback.print_exc()
+		finally:
+			self.clock.after(self.interval, self._drain)
+
+	def close(self):
+		self.running = False
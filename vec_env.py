@@ -0,0 +1,149 @@
+import numpy as np
+
+from probability import COMPLETION_PROBABILITIES, EXPECTED_SCORES
+from q_table import (ACTION_TYPES, ACTION_TYPE_WEIGHTS, LEGAL_MASKS, N_ACTIONS, OPEN_CATEGORIES, ROLL_ACTION,
+					 SCORE_ACTIONS, HOLD_ACTIONS, RELEASE_ACTIONS)
+from scoring import CATEGORY_COLUMNS, KEEP_INDEX, KEEP_SCORE_TABLE, keep_ids
+from state import Action, Category
+
+ALL_USED = (1 << len(Category)) - 1
+_FACES = np.arange(1, 7)
+_POSITIONS = np.arange(5)
+_CATEGORY_BITS = 1 << np.arange(len(Category))
+_COUNT_SHIFTS = 3 * np.arange(6)
+_INITIAL_TABLE = np.ones(6, dtype=np.int64)
+_INITIAL_TABLE[5] = 0
+_EMPTY_KEEP = KEEP_INDEX[()]
+_HIGH_VALUE_COLUMNS = [CATEGORY_COLUMNS[category] for category in
+					   (Category.YAHTZEE, Category.LARGE_STRAIGHT, Category.FOUR_OF_A_KIND)]
+
+
+def _sorted_faces(counts: np.ndarray) -> np.ndarray:
+	# Face at each position of the sorted dice, 7 past the last die.
+	cumulative = counts.cumsum(axis=1)
+	return 1 + (cumulative[:, None, :] <= _POSITIONS[None, :, None]).sum(axis=2)
+
+
+def _select_counts(counts: np.ndarray, bitmasks: np.ndarray) -> np.ndarray:
+	chosen = ((bitmasks[:, None] >> _POSITIONS) & 1).astype(bool)
+	return ((_sorted_faces(counts)[:, :, None] == _FACES) & chosen[:, :, None]).sum(axis=1)
+
+
+class VecEnv:
+	"""
+	Plays many independent solitaire games in lockstep on NumPy arrays.
+
+	Dice are kept as face counts on the table and in hand, actions use the Q-table action IDs and
+	rewards follow QLearningYahtzee.evaluate_reward. A game is done once every category is used or
+	it has taken `max_steps` actions; callers restart finished games with reset(done).
+	"""
+
+	def __init__(self, num_envs: int, max_steps: int | None = None, seed: int | None = None):
+		self.num_envs = num_envs
+		self.max_steps = max_steps
+		self.rng = np.random.default_rng(seed)
+		self.table = np.zeros((num_envs, 6), dtype=np.int64)
+		self.held = np.zeros((num_envs, 6), dtype=np.int64)
+		self.rolls_left = np.zeros(num_envs, dtype=np.int64)
+		self.used = np.zeros(num_envs, dtype=np.int64)
+		self.previous_action = np.zeros(num_envs, dtype=np.int64)
+		self.score = np.zeros(num_envs, dtype=np.int64)
+		self.steps = np.zeros(num_envs, dtype=np.int64)
+		self.reset(np.ones(num_envs, dtype=bool))
+
+	def reset(self, done: np.ndarray):
+		self.table[done] = _INITIAL_TABLE
+		self.held[done] = 0
+		self.rolls_left[done] = 3
+		self.used[done] = 0
+		self.previous_action[done] = Action.ROLL.value
+		self.score[done] = 0
+		self.steps[done] = 0
+
+	def state_ids(self) -> np.ndarray:
+		return ((self.table << _COUNT_SHIFTS).sum(axis=1) | (self.held << _COUNT_SHIFTS).sum(axis=1) << 18
+				| self.rolls_left << 36 | self.used << 38)
+
+	def action_types(self) -> np.ndarray:
+		return ACTION_TYPES[self.rolls_left, self.previous_action, (self.table.sum(axis=1) > 0).astype(np.int64),
+							(self.held.sum(axis=1) > 0).astype(np.int64)]
+
+	def legal_masks(self) -> np.ndarray:
+		legal = LEGAL_MASKS[self.rolls_left, self.previous_action, self.table.sum(axis=1), self.held.sum(axis=1)]
+		legal[:, SCORE_ACTIONS:HOLD_ACTIONS] &= OPEN_CATEGORIES[self.used]
+		return legal
+
+	def sample_actions(self, legal: np.ndarray, types: np.ndarray) -> np.ndarray:
+		cumulative = (types * ACTION_TYPE_WEIGHTS).cumsum(axis=1)
+		draws = self.rng.random(self.num_envs) * cumulative[:, -1]
+		chosen_types = (cumulative <= draws[:, None]).sum(axis=1)
+		type_ranges = np.array([[ROLL_ACTION, SCORE_ACTIONS], [HOLD_ACTIONS, RELEASE_ACTIONS],
+								[RELEASE_ACTIONS, N_ACTIONS], [SCORE_ACTIONS, HOLD_ACTIONS]])
+		columns = np.arange(N_ACTIONS)
+		ranges = type_ranges[chosen_types]
+		in_type = legal & (columns >= ranges[:, [0]]) & (columns < ranges[:, [1]])
+		scores = np.where(in_type, self.rng.random((self.num_envs, N_ACTIONS)), -1.0)
+		return scores.argmax(axis=1)
+
+	def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+		available = ALL_USED & ~self.used
+		rewards = np.zeros(self.num_envs)
+
+		rolling = actions == ROLL_ACTION
+		scoring = (actions >= SCORE_ACTIONS) & (actions < HOLD_ACTIONS)
+		holding = (actions >= HOLD_ACTIONS) & (actions < RELEASE_ACTIONS)
+		releasing = actions >= RELEASE_ACTIONS
+
+		if rolling.any():
+			self.rolls_left[rolling] -= 1
+			dice = self.rng.integers(1, 7, size=(rolling.sum(), 5))
+			in_play = _POSITIONS[None, :] < self.table[rolling].sum(axis=1)[:, None]
+			self.table[rolling] = ((dice[:, :, None] == _FACES) & in_play[:, :, None]).sum(axis=1)
+			rewards[rolling] += 0.1 * self.rolls_left[rolling]
+
+		if holding.any():
+			moved = _select_counts(self.table[holding], actions[holding] - HOLD_ACTIONS)
+			self.table[holding] -= moved
+			self.held[holding] += moved
+			expected = EXPECTED_SCORES[self.rolls_left[holding], keep_ids(self.held[holding])]
+			rewards[holding] += self._masked_total(expected, available[holding])
+			rewards[holding] += 0.1 * (moved > 0).sum(axis=1)
+
+		if releasing.any():
+			moved = _select_counts(self.held[releasing], actions[releasing] - RELEASE_ACTIONS)
+			self.held[releasing] -= moved
+			self.table[releasing] += moved
+			expected = EXPECTED_SCORES[self.rolls_left[releasing], _EMPTY_KEEP]
+			rewards[releasing] += self._masked_total(expected, available[releasing])
+			rewards[releasing] -= 0.1 * self.held[releasing].sum(axis=1)
+
+		points = np.zeros(self.num_envs, dtype=np.int64)
+		if scoring.any():
+			columns = actions[scoring] - SCORE_ACTIONS
+			points[scoring] = KEEP_SCORE_TABLE[keep_ids(self.table[scoring] + self.held[scoring]), columns]
+			self.used[scoring] |= 1 << columns
+			self.score[scoring] += points[scoring]
+			rewards[scoring] += 2 * points[scoring]
+
+		rolls = self.rolls_left
+		expected = EXPECTED_SCORES[rolls, keep_ids(self.table + self.held)]
+		rewards += 0.5 * self._masked_total(expected, available)
+		rewards -= 0.5 * ((rolls == 0) & (self.held.sum(axis=1) == 0))
+		held_keeps = keep_ids(self.held)
+		rewards += 2 * COMPLETION_PROBABILITIES[rolls, held_keeps][:, _HIGH_VALUE_COLUMNS].sum(axis=1)
+
+		self.previous_action = np.select([rolling, scoring, holding], [Action.ROLL.value, Action.SCORE.value,
+																	   Action.HOLD.value], Action.RELEASE.value)
+		self.steps += 1
+		self.table[scoring] = _INITIAL_TABLE
+		self.held[scoring] = 0
+		self.rolls_left[scoring] = 3
+
+		done = self.used == ALL_USED
+		if self.max_steps is not None:
+			done |= self.steps >= self.max_steps
+		return rewards, done
+
+	@staticmethod
+	def _masked_total(expected: np.ndarray, available: np.ndarray) -> np.ndarray:
+		return (expected * ((available[:, None] & _CATEGORY_BITS) > 0)).sum(axis=1)